@@ -0,0 +1,96 @@
+import os
+import numpy as np
+import pandas as pd
+from database import supabase_get, supabase_post
+
+# --- Statistics backend ---
+METRICS = {"Depression": "pred_depression", "Schizophrenia": "pred_schizophrenia"}
+BUCKETS = {"Daily": "D", "Weekly": "W-MON", "Monthly": "MS"}
+STATS = ["mean", "min", "max", "count"]
+STATS_MAX_POINTS = int(os.getenv("STATS_MAX_POINTS", "500"))  # point budget per plotted line
+STATS_ROLLING_WINDOW = int(os.getenv("STATS_ROLLING_WINDOW", "7"))  # buckets
+STATS_RPC = os.getenv("SUPABASE_STATS_RPC")  # e.g. "journal_stats", see supabase/journal_stats.sql
+
+
+def fetch_prediction_series(user_id):
+    # Both metrics in one request, indexed by date_time
+    res = supabase_get("Journals", params={
+        "user_id": f"eq.{user_id}",
+        "select": "date_time," + ",".join(METRICS.values()),
+        "order": "date_time",
+    })
+    res.raise_for_status()
+    df = pd.DataFrame(res.json(), columns=["date_time", *METRICS.values()])
+    df["date_time"] = pd.to_datetime(df["date_time"])
+    for column in METRICS.values():
+        df[column] = pd.to_numeric(df[column], errors="coerce")
+    return df.set_index("date_time")
+
+
+def bucket_series(series, bucket="Daily", rolling=STATS_ROLLING_WINDOW):
+    # Per-bucket mean/min/max/count for every metric, plus a rolling mean
+    # of the bucket means; empty buckets are dropped.
+    # Left-labelled buckets match Postgres date_trunc (weeks start on Monday)
+    stats = series[list(METRICS.values())].resample(BUCKETS[bucket], label="left", closed="left").agg(STATS)
+    for column in METRICS.values():
+        stats[(column, "rolling")] = stats[(column, "mean")].rolling(rolling, min_periods=1).mean()
+    counts = stats.xs("count", axis=1, level=1).sum(axis=1)
+    return stats[counts > 0]
+
+
+def fetch_bucketed_stats(user_id, bucket="Daily"):
+    # Aggregate in Postgres when the RPC is installed, otherwise in pandas
+    if not STATS_RPC:
+        return bucket_series(fetch_prediction_series(user_id), bucket)
+    res = supabase_post(f"rpc/{STATS_RPC}", json={
+        "p_user_id": user_id,
+        "p_bucket": {"Daily": "day", "Weekly": "week", "Monthly": "month"}[bucket],
+    })
+    res.raise_for_status()
+    rows = pd.DataFrame(res.json())
+    if rows.empty:
+        return pd.DataFrame()
+    rows["bucket"] = pd.to_datetime(rows["bucket"])
+    rows = rows.set_index("bucket").sort_index()
+    stats = pd.DataFrame(index=rows.index)
+    for column in METRICS.values():
+        for stat in STATS:
+            stats[(column, stat)] = pd.to_numeric(rows[f"{column}_{stat}"])
+        stats[(column, "rolling")] = stats[(column, "mean")].rolling(STATS_ROLLING_WINDOW, min_periods=1).mean()
+    stats.columns = pd.MultiIndex.from_tuples(stats.columns)
+    return stats
+
+
+def downsample(series, max_points=STATS_MAX_POINTS):
+    # Average consecutive points into at most `max_points` bins (timestamps
+    # included) so long histories plot at a fixed cost
+    series = series.dropna()
+    n = len(series)
+    if n <= max_points:
+        return series
+    starts = np.linspace(0, n, max_points, endpoint=False).astype(np.int64)
+    sizes = np.diff(np.append(starts, n))
+    times = series.index.asi8
+    values = series.to_numpy(dtype=float)
+    # Average each bin's offsets from its first timestamp, in float: summing
+    # raw int64 nanoseconds overflows after a handful of points
+    first = times[starts]
+    offsets = (times - np.repeat(first, sizes)).astype(float)
+    mean_times = first + (np.add.reduceat(offsets, starts) / sizes).astype(np.int64)
+    mean_values = np.add.reduceat(values, starts) / sizes
+    unit = np.datetime_data(series.index.values.dtype)[0]  # asi8 is in the index's own resolution
+    return pd.Series(mean_values, index=pd.to_datetime(mean_times, unit=unit), name=series.name)
+
+
+# --- Data versions ---
+# Bumped on every journal write made by this process; cached charts are keyed
+# on it so they are re-rendered only after the underlying data changed.
+_data_versions = {}
+
+
+def mark_changed(user_id):
+    _data_versions[user_id] = _data_versions.get(user_id, 0) + 1
+
+
+def data_version(user_id):
+    return _data_versions.get(user_id, 0)
@@ -1,6 +1,15 @@
 import streamlit as st
 from project_utils import *
-import time
+from model_registry import warm_models, record_event
+from note_store import NoteStore
+from charts import CHART_BACKENDS
+from tracing import start_metrics_server, start_rerun
+from related_entries import RELATED_ENTRIES, related_notes, remove_note
+import write_behind
+
+# --- Tracing ---
+start_rerun()
+start_metrics_server()
 
 # --- Page Setup ---
 st.set_page_config(page_title="Harmony", layout="wide")
@@ -67,6 +76,10 @@ for key, val in defaults.items():
 # --- Login ---
 if "email" not in st.session_state:
     login_screen()
+    # Login needs no models; load them in the background once the form is drawn
+    record_event("first_paint")
+    if INFERENCE_MODE == "local":
+        warm_models()
     st.stop()
 
 # --- Sidebar Navigation ---
@@ -100,6 +113,36 @@ with st.sidebar:
         st.session_state.clear()
         st.experimental_rerun()
 
+    dev_panel = st.empty() if DEV_PANEL else None
+
+def finish_rerun():
+    # Fill the developer panel with this rerun's spans, then end the script
+    if dev_panel is not None:
+        show_dev_panel(dev_panel)
+    st.stop()
+
+record_event("first_paint")
+if INFERENCE_MODE == "local":
+    warm_models()
+
+# --- Note Store ---
+if "note_store" not in st.session_state or st.session_state.note_store.user_id != st.session_state["user_id"]:
+    st.session_state.note_store = NoteStore(st.session_state["user_id"])
+store = st.session_state.note_store
+
+# --- Background Writes ---
+# Apply predictions and queued inserts that finished since the last rerun
+for finished_id, fields in write_behind.pop_completed(store.user_id).items():
+    store.patch(finished_id, fields)
+for row in write_behind.pop_inserted(store.user_id):
+    store.add(row)
+
+if "flash" in st.session_state:
+    st.success(st.session_state.pop("flash"))
+queued = write_behind.pending_count(store.user_id)
+if queued:
+    st.info(f"{queued} change(s) waiting to sync with the server. They will be retried automatically.")
+
 # --- View State from nav_choice ---
 if st.session_state.nav_choice == "New Note":
     st.session_state.show_form = True
@@ -116,14 +159,19 @@ else:
 
 # --- View Note ---
 if st.session_state.view_note:
-    df = get_notes_from_supabase()
     note_id = st.session_state.view_note
-    note = df[df["id"] == int(note_id)].iloc[0]
+    note = store.get(int(note_id))
+    if note is None:
+        st.warning("This note is no longer available.")
+        st.session_state.view_note = None
+        finish_rerun()
 
     st.subheader(f"Editing: {note['title']}")
 
     prediction_msg = note.get("prediction_message", "")
-    if isinstance(prediction_msg, str) and prediction_msg.strip() and prediction_msg.strip() != "0.0":
+    if note.get("pred_depression", 0.0) is None:
+        st.info("Scoring this note... the prediction will appear on the next refresh.")
+    elif isinstance(prediction_msg, str) and prediction_msg.strip() and prediction_msg.strip() != "0.0":
         st.info(prediction_msg)
 
     new_title = st.text_input("Title (max 100 characters)", value=note["title"][:100], max_chars=100, key="edit_title")
@@ -147,26 +195,44 @@ if st.session_state.view_note:
     with col1:
         if st.button("Update and Save Note"):
             if new_title.strip() and new_body.strip():
-                prediction = predict_both(new_body)
-                delete_note_from_supabase(int(note_id))
-                save_note_to_supabase(
-                    title=new_title,
-                    body=new_body,
-                    pred_depression=prediction[0],
-                    pred_schizophrenia=prediction[1],
-                    prediction_message=prediction[2]
-                )
-                st.success("Note updated successfully.")
-                time.sleep(2)
-                st.session_state.view_note = None
-                rerun_flag = True
+                changes = {}
+                if new_title != note["title"]:
+                    changes["title"] = new_title
+                # Only re-score (and resend) the body when it actually changed;
+                # unless cached, scoring happens in the background
+                prediction = None
+                if new_body != note["body"]:
+                    prediction = cached_prediction(new_body) or (None, None, "")
+                    changes.update(
+                        body=new_body,
+                        pred_depression=prediction[0],
+                        pred_schizophrenia=prediction[1],
+                        prediction_message=prediction[2]
+                    )
+                status, error = write_behind.update_note(int(note_id), store.user_id, changes)
+                if status == "failed":
+                    st.error(f"Failed to update note: {error}")
+                else:
+                    store.patch(int(note_id), changes)
+                    if prediction and prediction[0] is None:
+                        write_behind.schedule_scoring(int(note_id), store.user_id, new_body)
+                    if prediction:
+                        write_behind.schedule_embedding(int(note_id), store.user_id, new_body)
+                    st.session_state.flash = (
+                        "Note updated successfully." if status == "saved" else
+                        "You appear to be offline. The edit was queued and will be saved automatically."
+                    )
+                    st.session_state.view_note = None
+                    rerun_flag = True
             else:
                 st.warning("Title and body cannot be empty.")
 
     with col2:
         if st.button("Delete Note"):
-            delete_note_from_supabase(int(note_id))
-            st.success("Note deleted.")
+            if delete_note_from_supabase(int(note_id)):
+                store.remove(int(note_id))
+                remove_note(store.user_id, int(note_id))
+                st.session_state.flash = "Note deleted."
             st.session_state.view_note = None
             rerun_flag = True
 
@@ -178,22 +244,39 @@ if st.session_state.view_note:
     if rerun_flag:
         st.experimental_rerun()
 
-    st.stop()
+    # --- Related Entries ---
+    if RELATED_ENTRIES:
+        with st.expander("Related entries"):
+            related = [(i, score) for i, score in related_notes(store.user_id, int(note_id)) if i in store.notes]
+            if not related:
+                st.caption("No related entries yet. New notes are indexed shortly after saving.")
+            for related_id, score in related:
+                text_col, open_col = st.columns([4, 1])
+                with text_col:
+                    st.markdown(f"**{store.notes[related_id]['title']}** ({score:.0%} similar)")
+                with open_col:
+                    if st.button("Open", key=f"related_{related_id}"):
+                        st.session_state.view_note = related_id
+                        st.experimental_rerun()
+
+    finish_rerun()
 
 # --- Statistics View ---
 elif st.session_state.show_analysis:
     st.subheader("Statistics Dashboard")
     with st.form("choose_analysis"):
         option = st.selectbox("Which analysis?", ["Depression", "Schizophrenia"])
+        bucket = st.selectbox("Group by", ["All entries", "Daily", "Weekly", "Monthly"])
+        backend = st.selectbox("Chart type", CHART_BACKENDS, index=CHART_BACKENDS.index(CHART_BACKEND))
         submitted = st.form_submit_button("Show")
 
     if submitted:
-        if option == "Depression":
-            show_analysis_depression()
-        else:
-            show_analysis_schizo()
+        # Rows synced from other sessions also change what gets plotted
+        store.sync()
+        version = (data_version(store.user_id), store.high_water_mark, len(store))
+        show_analysis(option, bucket, backend, version)
 
-    st.stop()
+    finish_rerun()
 
 # --- New Note View ---
 elif st.session_state.show_form:
@@ -205,21 +288,23 @@ elif st.session_state.show_form:
     save_flag = False
     if st.button("Predict and Save Note"):
         if title.strip() and body.strip():
-            prediction = predict_both(body)
-            save_note_to_supabase(
-                title=title,
-                body=body,
-                pred_depression=prediction[0],
-                pred_schizophrenia=prediction[1],
-                prediction_message=prediction[2]
-            )
-            st.success(f"{prediction[2]}")
-            time.sleep(2)
+            # Persist right away; unless cached, the prediction is filled in by the background worker
+            prediction = cached_prediction(body)
+            status, saved = write_behind.save_note(title, body, store.user_id, prediction)
+            if status == "failed":
+                st.error(f"Failed to save note: {saved}")
+                finish_rerun()
+            if status == "saved":
+                store.add(saved)
+                st.session_state.flash = prediction[2] if prediction else "Note saved. Scoring in progress..."
+            else:
+                st.session_state.flash = "You appear to be offline. The note was queued and will be saved automatically."
             st.session_state.show_form = False
             st.session_state.prediction = None
             st.session_state.prediction_message = None
             st.session_state.view_note = None
             st.session_state.nav_choice = "Saved Notes"
+            st.session_state.notes_page = 0  # show the new note on page 1
             save_flag = True
         else:
             st.warning("Title and body cannot be empty.")
@@ -227,25 +312,31 @@ elif st.session_state.show_form:
     if save_flag:
         st.experimental_rerun()
 
-    st.stop()
+    finish_rerun()
 
 # --- Saved Notes Grid ---
 st.subheader("Saved Notes")
-df = get_notes_from_supabase()
+if "notes_page" not in st.session_state:
+    st.session_state.notes_page = 0
+store.sync()
+page = st.session_state.notes_page = min(st.session_state.notes_page, max(0, (len(store) - 1) // NOTES_PAGE_SIZE))
+notes, has_next = store.page(page, NOTES_PAGE_SIZE)
 
-if df.empty:
+if not notes:
     st.info("No notes found.")
 else:
     note_to_open = None
     cols = st.columns(4)
-    for idx, (_, note) in enumerate(df.iterrows()):
+    for idx, note in enumerate(notes):
         with cols[idx % 4]:
             with st.container():
                 title_short = note["title"][:20] + ("..." if len(note["title"]) > 20 else "")
+                if note.get("pred_depression", 0.0) is None:
+                    title_short = "⏳ " + title_short  # still being scored
                 st.markdown("#### " + title_short)
                 st.text_area(
                     label="Preview",
-                    value=preview(note["body"]),
+                    value=preview(note["preview"]),
                     height=180,
                     disabled=True,
                     label_visibility="collapsed",
@@ -257,3 +348,22 @@ else:
     if note_to_open:
         st.session_state.view_note = note_to_open
         st.experimental_rerun()
+
+# --- Paging Controls ---
+prev_col, page_col, refresh_col, next_col = st.columns([1, 2, 1, 1])
+with prev_col:
+    if page > 0 and st.button("Previous", key="notes_prev"):
+        st.session_state.notes_page -= 1
+        st.experimental_rerun()
+with page_col:
+    st.markdown(f"<p style='text-align:center'>Page {page + 1}</p>", unsafe_allow_html=True)
+with refresh_col:
+    if st.button("Refresh", key="notes_refresh"):
+        store.sync(force=True)
+        st.experimental_rerun()
+with next_col:
+    if has_next and st.button("Next", key="notes_next"):
+        st.session_state.notes_page += 1
+        st.experimental_rerun()
+
+finish_rerun()
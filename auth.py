@@ -0,0 +1,71 @@
+import os
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+import bcrypt
+from database import supabase_get, supabase_post
+from tracing import span
+
+# --- Authentication service ---
+# bcrypt runs on a bounded worker pool (bcrypt releases the GIL, so hashes run
+# in parallel up to AUTH_WORKERS) instead of on the Streamlit script thread.
+# User lookups project only the columns login needs and are cached briefly,
+# so a register or retry burst doesn't repeat the same request.
+BCRYPT_ROUNDS = int(os.getenv("BCRYPT_ROUNDS", "12"))  # cost factor for new hashes
+AUTH_WORKERS = int(os.getenv("AUTH_WORKERS", str(os.cpu_count() or 2)))
+USER_CACHE_TTL = float(os.getenv("USER_CACHE_TTL", "30"))  # seconds
+USER_CACHE_SIZE = int(os.getenv("USER_CACHE_SIZE", "1024"))
+USER_COLUMNS = "id,email,name,password"
+
+_pool = ThreadPoolExecutor(max_workers=AUTH_WORKERS, thread_name_prefix="bcrypt")
+_user_cache = OrderedDict()  # email -> (expires_at, user row or None), oldest first
+_cache_lock = threading.Lock()
+
+
+# --- Password hashing ---
+def check_password(password, hashed):
+    with span("auth.bcrypt_check"):
+        return _pool.submit(bcrypt.checkpw, password.encode(), hashed.encode()).result()
+
+
+def hash_password(password):
+    with span("auth.bcrypt_hash", rounds=BCRYPT_ROUNDS):
+        salt = bcrypt.gensalt(rounds=BCRYPT_ROUNDS)
+        return _pool.submit(bcrypt.hashpw, password.encode(), salt).result().decode()
+
+
+# --- User lookup ---
+def get_user(email):
+    # Raises on network/HTTP errors; returns None when no user has this email
+    now = time.monotonic()
+    with _cache_lock:
+        cached = _user_cache.get(email)
+    if cached and cached[0] > now:
+        return cached[1]
+    res = supabase_get("Users", params={"email": f"eq.{email}", "select": USER_COLUMNS, "limit": "1"})
+    res.raise_for_status()
+    data = res.json()
+    user = data[0] if data else None
+    with _cache_lock:
+        _user_cache[email] = (now + USER_CACHE_TTL, user)
+        _user_cache.move_to_end(email)
+        # Same TTL for every entry, so expired ones are always at the front;
+        # the size cap bounds memory under a burst of distinct emails
+        while _user_cache and (next(iter(_user_cache.values()))[0] <= now or len(_user_cache) > USER_CACHE_SIZE):
+            _user_cache.popitem(last=False)
+    return user
+
+
+def invalidate_user(email):
+    with _cache_lock:
+        _user_cache.pop(email, None)
+
+
+def create_user(email, name, password):
+    # Returns the Supabase response; the cached "no such user" entry is dropped on success
+    new_user = {"email": email, "name": name, "password": hash_password(password)}
+    res = supabase_post("Users", json=new_user, headers={"Prefer": "return=minimal"})
+    if res.status_code == 201:
+        invalidate_user(email)
+    return res
@@ -0,0 +1,73 @@
+import argparse
+import json
+import shutil
+import tempfile
+import time
+from datetime import datetime
+
+import numpy as np
+
+from related_entries import EmbeddingIndex
+
+# --- Related-entries index benchmark ---
+# Random unit vectors stand in for sentence embeddings, so this measures the
+# index itself (append, open, top-k search), not the embedding model:
+#   python -m benchmarks.bench_related --sizes 1000,10000,100000 --out related.json
+
+
+def bench(size, dim, queries, k, chunk):
+    root = tempfile.mkdtemp(prefix="related-bench-")
+    try:
+        rng = np.random.default_rng(size)
+        index = EmbeddingIndex(1, root)
+        start = time.perf_counter()
+        for first in range(0, size, chunk):
+            rows = min(chunk, size - first)
+            index.append(np.arange(first, first + rows), rng.standard_normal((rows, dim), dtype=np.float32))
+        append_s = time.perf_counter() - start
+
+        reader = EmbeddingIndex(1, root)
+        start = time.perf_counter()
+        live = len(reader)
+        open_s = time.perf_counter() - start
+
+        samples = []
+        for query_id in rng.integers(0, size, size=queries):
+            start = time.perf_counter()
+            reader.search(reader.vector_for(int(query_id)), k, exclude=[int(query_id)])
+            samples.append((time.perf_counter() - start) * 1000)
+        samples.sort()
+        return {
+            "size": size,
+            "live_rows": live,
+            "dim": dim,
+            "append_s": round(append_s, 4),
+            "open_ms": round(open_s * 1000, 3),
+            "search_p50_ms": round(samples[len(samples) // 2], 3),
+            "search_p95_ms": round(samples[max(0, int(len(samples) * 0.95) - 1)], 3),
+            "index_mb": round(size * dim * 2 / 2 ** 20, 2),
+        }
+    finally:
+        shutil.rmtree(root, ignore_errors=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the memory-mapped related-entries index.")
+    parser.add_argument("--sizes", default="1000,10000,100000")
+    parser.add_argument("--dim", type=int, default=384)
+    parser.add_argument("--queries", type=int, default=50)
+    parser.add_argument("--k", type=int, default=5)
+    parser.add_argument("--append-chunk", type=int, default=1000, help="rows per append call")
+    parser.add_argument("--out", default="bench_related.json")
+    args = parser.parse_args()
+    results = [bench(int(size), args.dim, args.queries, args.k, args.append_chunk)
+               for size in args.sizes.split(",") if size]
+    for result in results:
+        print(json.dumps(result))
+    with open(args.out, "w") as f:
+        json.dump({"meta": {"timestamp": datetime.now().isoformat(timespec="seconds"), "args": vars(args)},
+                   "results": results}, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
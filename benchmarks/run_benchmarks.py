@@ -0,0 +1,157 @@
+import argparse
+import json
+import os
+import platform
+import random
+import statistics
+import subprocess
+import sys
+import time
+from datetime import datetime
+
+from benchmarks.stub_supabase import StubDatabase, serve, synthetic_text
+
+# --- Offline benchmark suite ---
+# Run from the repository root (model paths are relative):
+#   python -m benchmarks.run_benchmarks --sizes 100,1000,10000 --out bench.json
+# Supabase calls go to a seeded local stub, never to the URL in .env.
+
+
+def timed(fn, repeat):
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - start) * 1000)
+    return {
+        "repeat": repeat,
+        "mean_ms": round(statistics.fmean(samples), 3),
+        "p50_ms": round(statistics.median(samples), 3),
+        "p95_ms": round(sorted(samples)[max(0, int(len(samples) * 0.95) - 1)], 3),
+        "min_ms": round(min(samples), 3),
+    }
+
+
+def record(results, name, fn, repeat, **labels):
+    try:
+        entry = timed(fn, repeat)
+    except Exception as e:
+        entry = {"error": f"{type(e).__name__}: {e}"}
+    results.append({"name": name, **labels, **entry})
+    print(json.dumps(results[-1]), file=sys.stderr)
+
+
+def bench_storage(results, db, size, repeat):
+    import analytics
+    import charts
+    import project_utils as pu
+    from note_store import NoteStore
+
+    db.seed(users=1, notes_per_user=size)
+    user_id = 1
+    labels = {"size": size}
+    record(results, "list_notes_page", lambda: pu.list_notes_page(user_id), repeat, **labels)
+    record(results, "note_store_full_sync", lambda: NoteStore(user_id).sync(), repeat, **labels)
+    record(results, "get_note_by_id", lambda: pu.get_note_by_id(size // 2), repeat, **labels)
+
+    saved = []
+    record(results, "save_note", lambda: saved.append(
+        pu.save_note_to_supabase("Bench", synthetic_text(random.Random()), 0.0, 0.0, "", user_id=user_id)
+    ), repeat, **labels)
+    ids = iter([row["id"] for row in saved if row])
+    record(results, "update_note", lambda: pu.update_note_in_supabase(next(ids), {"title": "Edited"}, user_id=user_id),
+           min(repeat, len(saved)), **labels)
+    ids = iter([row["id"] for row in saved if row])
+    record(results, "delete_note", lambda: pu.delete_note_from_supabase(next(ids), user_id=user_id),
+           min(repeat, len(saved)), **labels)
+
+    record(results, "fetch_prediction_series", lambda: analytics.fetch_prediction_series(user_id), repeat, **labels)
+    series = analytics.fetch_prediction_series(user_id)
+    for bucket in analytics.BUCKETS:
+        record(results, "bucket_series", lambda: analytics.bucket_series(series, bucket), repeat, bucket=bucket, **labels)
+    rpc = analytics.STATS_RPC
+    analytics.STATS_RPC = "journal_stats"
+    record(results, "stats_rpc", lambda: analytics.fetch_bucketed_stats(user_id, "Weekly"), repeat, **labels)
+    analytics.STATS_RPC = rpc
+
+    versions = iter(range(10 ** 9))
+    for backend in ("png", "svg"):
+        record(results, "render_chart", lambda: charts.render_chart(user_id, "Depression", "Daily", backend, ("bench", next(versions))),
+               repeat, backend=backend, **labels)
+
+
+def bench_models(results, batch_sizes, repeat):
+    import project_utils as pu
+    from model_registry import load_timings
+
+    rng = random.Random(1)
+    single = synthetic_text(rng)
+    record(results, "predict_label_depression", lambda: pu.predict_label_depression(single), repeat, batch_size=1)
+    record(results, "predict_label_schizo", lambda: pu.predict_label_schizo(single), repeat, batch_size=1)
+    for batch_size in batch_sizes:
+        texts = [synthetic_text(rng) for _ in range(batch_size)]
+        labels = {"batch_size": batch_size}
+        record(results, "predict_many_depression", lambda: pu.predict_many_depression(texts), repeat, **labels)
+        record(results, "predict_many_schizo", lambda: pu.predict_many_schizo(texts), repeat, **labels)
+
+        def cold_predict_many():
+            pu.prediction_cache.clear()
+            pu.predict_many(texts)
+        record(results, "predict_many", cold_predict_many, repeat, **labels)
+        record(results, "predict_many_cached", lambda: pu.predict_many(texts), repeat, **labels)
+
+    def cold_predict_both():
+        pu.prediction_cache.clear()
+        pu.predict_both(single)
+    record(results, "predict_both", cold_predict_both, repeat, batch_size=1)
+    results.append({"name": "model_load", **load_timings()})
+
+
+def git_commit():
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], text=True).strip()
+    except Exception:
+        return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark Harmony against a local Supabase stub.")
+    parser.add_argument("--sizes", default="100,1000,10000", help="notes per user, comma-separated")
+    parser.add_argument("--batch-sizes", default="1,8,32,128", help="prediction batch sizes, comma-separated")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--skip-models", action="store_true", help="only benchmark storage and statistics")
+    parser.add_argument("--out", default="bench_results.json")
+    args = parser.parse_args()
+
+    db = StubDatabase()
+    server, url = serve(db)
+    # Must be set before the app modules read their configuration
+    os.environ["SUPABASE_URL"] = url
+    os.environ["SUPABASE_KEY"] = "benchmark"
+
+    results = []
+    started = time.time()
+    for size in [int(s) for s in args.sizes.split(",") if s]:
+        bench_storage(results, db, size, args.repeat)
+    if not args.skip_models:
+        bench_models(results, [int(b) for b in args.batch_sizes.split(",") if b], args.repeat)
+    server.shutdown()
+
+    report = {
+        "meta": {
+            "timestamp": datetime.now().isoformat(timespec="seconds"),
+            "commit": git_commit(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "duration_s": round(time.time() - started, 2),
+            "args": vars(args),
+        },
+        "results": results,
+    }
+    with open(args.out, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"Wrote {len(results)} results to {args.out}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,290 @@
+import json
+import random
+import re
+import threading
+from datetime import datetime, timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qsl, urlsplit
+
+# --- Local Supabase stand-in ---
+# Implements the subset of PostgREST the app uses: eq/neq/gt/gte/lt/lte/is
+# filters, or=(...)/and(...) groups, select, order, limit, Prefer headers,
+# the preview() computed column and the journal_stats RPC.
+
+WORDS = (
+    "today felt long and quiet I walked outside talked with friends slept badly "
+    "work was stressful the voices seemed louder again music helped me relax "
+    "tired hopeful anxious calm family dinner morning night thoughts racing"
+).split()
+PREVIEW_CHARS = 200
+
+
+def synthetic_text(rng, words=120):
+    return " ".join(rng.choice(WORDS) for _ in range(words))
+
+
+class FilterError(ValueError):
+    # Mirrors the 400 PostgREST returns when Postgres rejects a filter value
+    def __init__(self, message, code="22007"):
+        super().__init__(message)
+        self.code = code
+
+
+def _coerce(value, nested):
+    # PostgREST only strips double quotes inside or=/and= trees; on a plain
+    # column filter they reach Postgres verbatim and fail to parse
+    if value.startswith('"') and value.endswith('"'):
+        if not nested:
+            raise FilterError(f'invalid input syntax: {value}')
+        return value[1:-1]
+    return value
+
+
+def _compare(left, op, right):
+    if op == "is":
+        return left is None if right == "null" else str(left).lower() == right
+    if left is None:
+        return False
+    try:
+        left, right = float(left), float(right)
+    except (TypeError, ValueError):
+        left = str(left)
+    return {
+        "eq": left == right,
+        "neq": left != right,
+        "gt": left > right,
+        "gte": left >= right,
+        "lt": left < right,
+        "lte": left <= right,
+    }[op]
+
+
+def _split_top_level(text):
+    parts, depth, current, quoted = [], 0, "", False
+    for char in text:
+        if char == '"':
+            quoted = not quoted
+        elif not quoted and char == "(":
+            depth += 1
+        elif not quoted and char == ")":
+            depth -= 1
+        if char == "," and depth == 0 and not quoted:
+            parts.append(current)
+            current = ""
+        else:
+            current += char
+    if current:
+        parts.append(current)
+    return parts
+
+
+def _condition(expr, nested=False):
+    # "col.op.value", "and(...)" or "or(...)" -> predicate over a row
+    match = re.match(r"^(and|or)\((.*)\)$", expr)
+    if match:
+        combine = all if match.group(1) == "and" else any
+        preds = [_condition(part, nested=True) for part in _split_top_level(match.group(2))]
+        return lambda row: combine(pred(row) for pred in preds)
+    column, op, value = expr.split(".", 2)
+    value = _coerce(value, nested)
+    return lambda row: _compare(row.get(column), op, value)
+
+
+class StubDatabase:
+    def __init__(self):
+        self.tables = {"Users": [], "Journals": []}
+        self.next_ids = {"Users": 1, "Journals": 1}
+        self.lock = threading.Lock()
+
+    def insert(self, table, row):
+        row = dict(row)
+        row.setdefault("id", self.next_ids[table])
+        self.next_ids[table] = max(self.next_ids[table], row["id"]) + 1
+        self.tables[table].append(row)
+        return row
+
+    def seed(self, users=1, notes_per_user=100, seed=0):
+        rng = random.Random(seed)
+        self.tables = {"Users": [], "Journals": []}
+        self.next_ids = {"Users": 1, "Journals": 1}
+        start = datetime(2023, 1, 1)
+        for u in range(users):
+            user = self.insert("Users", {"email": f"user{u}@example.com", "name": f"User {u}", "password": ""})
+            for n in range(notes_per_user):
+                self.insert("Journals", {
+                    "user_id": user["id"],
+                    "date_time": (start + timedelta(hours=6 * n, seconds=u)).isoformat(timespec="microseconds"),
+                    "title": f"Entry {n}",
+                    "body": synthetic_text(rng),
+                    "pred_depression": round(rng.random() * 100, 2),
+                    "pred_schizophrenia": round(rng.random() * 100, 2),
+                    "prediction_message": "",
+                })
+
+    def query(self, table, params):
+        rows = self.tables[table]
+        for key, value in params:
+            if key in ("select", "order", "limit", "offset", "on_conflict"):
+                continue
+            if key in ("or", "and"):
+                pred = _condition(f"{key}{value}", nested=True)
+            else:
+                pred = _condition(f"{key}.{value}")
+            rows = [row for row in rows if pred(row)]
+        params = dict(params)
+        for term in reversed(params.get("order", "").split(",")):
+            if term:
+                column, _, direction = term.partition(".")
+                rows = sorted(rows, key=lambda row: (row.get(column) is None, row.get(column)),
+                              reverse=direction.startswith("desc"))
+        rows = rows[int(params.get("offset", 0)):]
+        if "limit" in params:
+            rows = rows[:int(params["limit"])]
+        return rows
+
+    def project(self, rows, select):
+        if not select or select == "*":
+            return [dict(row) for row in rows]
+        columns = select.split(",")
+        out = []
+        for row in rows:
+            item = {}
+            for column in columns:
+                if column == "preview":
+                    item["preview"] = (row.get("body") or "")[:PREVIEW_CHARS]
+                else:
+                    item[column] = row.get(column)
+            out.append(item)
+        return out
+
+    def journal_stats(self, user_id, bucket):
+        buckets = {}
+        for row in self.tables["Journals"]:
+            if row["user_id"] != user_id:
+                continue
+            ts = datetime.fromisoformat(row["date_time"])
+            if bucket == "day":
+                key = ts.replace(hour=0, minute=0, second=0, microsecond=0)
+            elif bucket == "week":
+                key = (ts - timedelta(days=ts.weekday())).replace(hour=0, minute=0, second=0, microsecond=0)
+            else:
+                key = ts.replace(day=1, hour=0, minute=0, second=0, microsecond=0)
+            buckets.setdefault(key, []).append(row)
+        result = []
+        for key in sorted(buckets):
+            item = {"bucket": key.isoformat()}
+            for column in ("pred_depression", "pred_schizophrenia"):
+                values = [r[column] for r in buckets[key] if r.get(column) is not None]
+                item[f"{column}_mean"] = sum(values) / len(values) if values else None
+                item[f"{column}_min"] = min(values) if values else None
+                item[f"{column}_max"] = max(values) if values else None
+                item[f"{column}_count"] = len(values)
+            result.append(item)
+        return result
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    db = None  # set by serve()
+
+    def log_message(self, format, *args):
+        pass
+
+    def _parse(self):
+        parts = urlsplit(self.path)
+        path = parts.path.split("/rest/v1/", 1)[-1]
+        return path, parse_qsl(parts.query, keep_blank_values=True)
+
+    def _body(self):
+        length = int(self.headers.get("Content-Length") or 0)
+        return json.loads(self.rfile.read(length) or b"null")
+
+    def _send(self, status, payload=None):
+        data = b"" if payload is None else json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _wants_rows(self):
+        return "return=representation" in (self.headers.get("Prefer") or "")
+
+    def do_GET(self):
+        table, params = self._parse()
+        if table not in self.db.tables:
+            return self._send(404, {"message": f"unknown table {table}"})
+        try:
+            with self.db.lock:
+                rows = self.db.project(self.db.query(table, params), dict(params).get("select"))
+        except FilterError as e:
+            return self._send(400, {"code": e.code, "message": str(e)})
+        self._send(200, rows)
+
+    def do_POST(self):
+        table, params = self._parse()
+        payload = self._body()
+        if table.startswith("rpc/"):
+            if table != "rpc/journal_stats":
+                return self._send(404, {"message": f"unknown function {table}"})
+            with self.db.lock:
+                return self._send(200, self.db.journal_stats(payload["p_user_id"], payload["p_bucket"]))
+        rows = payload if isinstance(payload, list) else [payload]
+        merge = "resolution=merge-duplicates" in (self.headers.get("Prefer") or "")
+        with self.db.lock:
+            saved = []
+            for row in rows:
+                existing = next((r for r in self.db.tables[table] if merge and r["id"] == row.get("id")), None)
+                if existing is not None:
+                    existing.update(row)
+                    saved.append(existing)
+                else:
+                    saved.append(self.db.insert(table, row))
+        self._send(201, saved if self._wants_rows() else None)
+
+    def do_PATCH(self):
+        table, params = self._parse()
+        fields = self._body()
+        try:
+            with self.db.lock:
+                rows = self.db.query(table, params)
+                for row in rows:
+                    row.update(fields)
+        except FilterError as e:
+            return self._send(400, {"code": e.code, "message": str(e)})
+        self._send(200 if self._wants_rows() else 204, rows if self._wants_rows() else None)
+
+    def do_DELETE(self):
+        table, params = self._parse()
+        try:
+            with self.db.lock:
+                doomed = {id(row) for row in self.db.query(table, params)}
+                self.db.tables[table] = [row for row in self.db.tables[table] if id(row) not in doomed]
+        except FilterError as e:
+            return self._send(400, {"code": e.code, "message": str(e)})
+        self._send(204)
+
+
+def serve(db=None, host="127.0.0.1", port=0):
+    # Starts the stub on a daemon thread; returns (server, base_url)
+    handler = type("BoundStubHandler", (StubHandler,), {"db": db or StubDatabase()})
+    server = ThreadingHTTPServer((host, port), handler)
+    threading.Thread(target=server.serve_forever, name="stub-supabase", daemon=True).start()
+    return server, f"http://{host}:{server.server_address[1]}"
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Run a local PostgREST-compatible Supabase stand-in.")
+    parser.add_argument("--port", type=int, default=54321)
+    parser.add_argument("--users", type=int, default=1)
+    parser.add_argument("--notes", type=int, default=1000, help="notes per user")
+    args = parser.parse_args()
+    db = StubDatabase()
+    db.seed(args.users, args.notes)
+    server, url = serve(db, port=args.port)
+    print(f"Stub Supabase listening on {url} (SUPABASE_URL={url}, any SUPABASE_KEY)")
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        server.shutdown()
@@ -0,0 +1,90 @@
+import io
+import os
+import time
+from functools import lru_cache
+import matplotlib
+matplotlib.use("Agg")
+import matplotlib.dates as mdates
+from matplotlib.figure import Figure
+import pandas as pd
+from analytics import METRICS, STATS_MAX_POINTS, downsample, fetch_bucketed_stats, fetch_prediction_series
+
+# --- Chart rendering ---
+# "png" and "svg" render a matplotlib Figure to bytes; "native" returns the
+# plotted data for st.line_chart so the browser draws it.
+CHART_BACKENDS = ["png", "svg", "native"]
+CHART_BACKEND = os.getenv("CHART_BACKEND", "png")
+CHART_CACHE_SIZE = int(os.getenv("CHART_CACHE_SIZE", "256"))
+# Writes from other processes (other app servers, rescore.py, journal_io.py)
+# don't move the local data version, so cached charts also expire after this long
+CHART_CACHE_TTL = float(os.getenv("CHART_CACHE_TTL", "60"))
+
+
+def cache_epoch():
+    # Changes every CHART_CACHE_TTL seconds; part of the render_chart cache key
+    return int(time.time() // CHART_CACHE_TTL) if CHART_CACHE_TTL > 0 else 0
+
+
+def chart_data(user_id, metric, bucket):
+    # Columns: value, plus min/max/rolling when bucketed; None when there is no data
+    column = METRICS[metric]
+    if bucket == "All entries":
+        series = fetch_prediction_series(user_id)[column].dropna()
+        if series.empty:
+            return None
+        return downsample(series).to_frame("value")
+    stats = fetch_bucketed_stats(user_id, bucket)
+    if stats.empty:
+        return None
+    stats = stats[column].dropna(subset=["mean"])
+    if stats.empty:
+        return None
+    data = pd.DataFrame({"value": downsample(stats["mean"]), "rolling": downsample(stats["rolling"])})
+    if len(stats) <= STATS_MAX_POINTS:
+        data["min"] = stats["min"]
+        data["max"] = stats["max"]
+    return data
+
+
+def build_figure(data, metric, bucket):
+    # An explicit Figure, never registered with pyplot's global figure manager
+    fig = Figure(figsize=(9, 4))
+    ax = fig.add_subplot()
+    bucketed = bucket != "All entries"
+    if "min" in data:
+        ax.fill_between(data.index, data["min"], data["max"], color='blue', alpha=0.15, label='Min-max')
+    if "rolling" in data:
+        ax.plot(data.index, data["rolling"], linestyle='--', color='orange', label='Rolling average')
+    ax.plot(data.index, data["value"], marker='o', linestyle='-', color='blue',
+            label=f'{bucket} mean' if bucketed else None)
+    ax.set_xlabel('Date & Time')
+    ax.set_ylabel(f'{metric} Probability')
+    ax.set_title(f'{metric} Analysis Over Time')
+    ax.grid(True)
+    ax.tick_params(axis='x', labelrotation=45)
+    ax.xaxis.set_major_formatter(mdates.DateFormatter('%d %B %y, %H:%M'))
+    if bucketed:
+        ax.legend()
+    fig.tight_layout()
+    return fig
+
+
+@lru_cache(maxsize=CHART_CACHE_SIZE)
+def render_chart(user_id, metric, bucket, backend, data_version):
+    # Cached per (user, metric, bucket, backend, data version) across sessions;
+    # callers must treat the returned DataFrame/bytes as read-only
+    data = chart_data(user_id, metric, bucket)
+    if data is None or backend == "native":
+        return data
+    fig = build_figure(data, metric, bucket)
+    try:
+        buffer = io.BytesIO()
+        fig.savefig(buffer, format=backend)
+        output = buffer.getvalue()
+        if backend == "svg":
+            # Drop the <?xml ...><!DOCTYPE ...> prolog; st.image only treats
+            # strings starting with "<svg" as SVG markup
+            output = output[output.index(b"<svg"):]
+        return output
+    finally:
+        fig.clear()
@@ -1,6 +1,10 @@
 import os
+import threading
 from dotenv import load_dotenv
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from tracing import span
 
 load_dotenv()
 
@@ -12,3 +16,69 @@ HEADERS = {
     "Authorization": f"Bearer {SUPABASE_KEY}",
     "Content-Type": "application/json"
 }
+
+# --- HTTP client settings ---
+SUPABASE_TIMEOUT = float(os.getenv("SUPABASE_TIMEOUT", "10"))  # seconds, per call
+SUPABASE_RETRIES = int(os.getenv("SUPABASE_RETRIES", "3"))
+SUPABASE_BACKOFF = float(os.getenv("SUPABASE_BACKOFF", "0.3"))  # 0.3s, 0.6s, 1.2s...
+SUPABASE_POOL_SIZE = int(os.getenv("SUPABASE_POOL_SIZE", "20"))
+
+# POST is left out so a retried insert can never create a duplicate row
+RETRY_METHODS = frozenset({"GET", "HEAD", "OPTIONS", "PATCH", "PUT", "DELETE"})
+RETRY_STATUSES = (429, 500, 502, 503, 504)
+
+_session = None
+_session_lock = threading.Lock()
+
+
+# --- Shared session ---
+# One keep-alive connection pool per process, shared by every Streamlit session
+def get_session():
+    global _session
+    if _session is None:
+        with _session_lock:
+            if _session is None:
+                retry = Retry(
+                    total=SUPABASE_RETRIES,
+                    backoff_factor=SUPABASE_BACKOFF,
+                    status_forcelist=RETRY_STATUSES,
+                    allowed_methods=RETRY_METHODS,
+                    respect_retry_after_header=True,
+                    raise_on_status=False,
+                )
+                adapter = HTTPAdapter(
+                    pool_connections=SUPABASE_POOL_SIZE,
+                    pool_maxsize=SUPABASE_POOL_SIZE,
+                    max_retries=retry,
+                )
+                session = requests.Session()
+                session.mount("https://", adapter)
+                session.mount("http://", adapter)
+                session.headers.update(HEADERS)
+                _session = session
+    return _session
+
+
+def supabase_request(method, path, **kwargs):
+    kwargs.setdefault("timeout", SUPABASE_TIMEOUT)
+    with span(f"supabase.{method.lower()}", table=path.split("?")[0]) as record:
+        res = get_session().request(method, f"{SUPABASE_URL}/rest/v1/{path}", **kwargs)
+        record["status"] = res.status_code
+        record["bytes"] = len(res.request.body or b"") + len(res.content)
+        return res
+
+
+def supabase_get(path, **kwargs):
+    return supabase_request("GET", path, **kwargs)
+
+
+def supabase_post(path, **kwargs):
+    return supabase_request("POST", path, **kwargs)
+
+
+def supabase_patch(path, **kwargs):
+    return supabase_request("PATCH", path, **kwargs)
+
+
+def supabase_delete(path, **kwargs):
+    return supabase_request("DELETE", path, **kwargs)
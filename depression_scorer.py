@@ -0,0 +1,113 @@
+import sys
+import numpy as np
+from scipy.special import expit  # sigmoid
+
+# --- Compiled depression scorer ---
+# Folds the fitted TfidfVectorizer + binary LogisticRegression into flat NumPy
+# arrays (vocabulary ids, IDF weights, coefficients) and scores a batch with
+# one sparse dot product and a sigmoid, instead of vectorizer.transform
+# followed by separate predict and predict_proba passes.
+
+
+class DepressionScorer:
+    def __init__(self, vectorizer, model):
+        if not self.supports(vectorizer, model):
+            raise ValueError("DepressionScorer needs a fitted TfidfVectorizer and a binary linear classifier")
+        self.analyzer = vectorizer.build_analyzer()
+        self.vocabulary = dict(vectorizer.vocabulary_)
+        n_features = len(self.vocabulary)
+        self.n_features = n_features
+        self.binary = bool(vectorizer.binary)
+        self.sublinear_tf = bool(vectorizer.sublinear_tf)
+        self.norm = vectorizer.norm
+        self.idf = np.asarray(vectorizer.idf_, dtype=np.float64) if vectorizer.use_idf else np.ones(n_features)
+        self.coef = np.asarray(model.coef_, dtype=np.float64).ravel()
+        self.intercept = float(np.ravel(model.intercept_)[0])
+        self.classes = np.asarray(model.classes_)
+        # predict_proba is softmax([-z, z]) = expit(2z) for multinomial binary LR
+        self.scale = 2.0 if getattr(model, "multi_class", None) == "multinomial" else 1.0
+
+    @staticmethod
+    def supports(vectorizer, model):
+        return (
+            hasattr(vectorizer, "vocabulary_")
+            and hasattr(vectorizer, "use_idf")
+            and (not vectorizer.use_idf or hasattr(vectorizer, "idf_"))
+            and vectorizer.norm in ("l1", "l2", None)
+            and hasattr(model, "coef_")
+            and np.asarray(model.coef_).shape == (1, len(vectorizer.vocabulary_))
+            and len(model.classes_) == 2
+        )
+
+    def decision_function(self, texts):
+        vocabulary, analyzer = self.vocabulary, self.analyzer
+        rows, cols = [], []
+        for row, text in enumerate(texts):
+            for token in analyzer(text):
+                col = vocabulary.get(token)
+                if col is not None:
+                    rows.append(row)
+                    cols.append(col)
+        n_docs = len(texts)
+        if not rows:
+            return np.full(n_docs, self.intercept)
+        # Term counts per (document, feature) pair
+        keys, counts = np.unique(np.asarray(rows, dtype=np.int64) * self.n_features + np.asarray(cols, dtype=np.int64),
+                                 return_counts=True)
+        doc, feature = np.divmod(keys, self.n_features)
+        tf = np.ones(len(counts)) if self.binary else counts.astype(np.float64)
+        if self.sublinear_tf:
+            tf = 1.0 + np.log(tf)
+        x = tf * self.idf[feature]
+        if self.norm == "l2":
+            length = np.sqrt(np.bincount(doc, weights=x * x, minlength=n_docs))
+        elif self.norm == "l1":
+            length = np.bincount(doc, weights=np.abs(x), minlength=n_docs)
+        else:
+            length = np.ones(n_docs)
+        dot = np.bincount(doc, weights=x * self.coef[feature], minlength=n_docs)
+        return dot / np.where(length > 0, length, 1.0) + self.intercept
+
+    def predict(self, texts):
+        # Returns (probability of classes_[1], predicted labels) for the batch
+        z = self.decision_function(texts)
+        probs = expit(self.scale * z)
+        labels = np.where(z > 0, self.classes[1], self.classes[0])
+        return probs, labels
+
+
+# --- CLI: parity check against the sklearn pipeline ---
+def verify(scorer, vectorizer, model, texts):
+    vec = vectorizer.transform(texts)
+    expected = model.predict_proba(vec)[:, 1]
+    expected_labels = model.predict(vec)
+    probs, labels = scorer.predict(texts)
+    return float(np.max(np.abs(probs - expected))), int(np.sum(labels != expected_labels))
+
+
+def main(argv):
+    import argparse
+    import joblib
+    from fast_tokenizer import SAMPLE_TEXTS
+    from model_registry import DEPRESSION_MODEL_PATH, DEPRESSION_VECTORIZER_PATH
+    parser = argparse.ArgumentParser(description="Check the compiled depression scorer against sklearn.")
+    parser.add_argument("--texts", help="file with one extra text per line")
+    parser.add_argument("--tolerance", type=float, default=1e-9)
+    args = parser.parse_args(argv)
+
+    vectorizer = joblib.load(DEPRESSION_VECTORIZER_PATH)
+    model = joblib.load(DEPRESSION_MODEL_PATH)
+    scorer = DepressionScorer(vectorizer, model)
+    rng = np.random.default_rng(0)
+    words = np.array(list(vectorizer.vocabulary_))
+    texts = list(SAMPLE_TEXTS) + [" ".join(rng.choice(words, size=n)) for n in rng.integers(1, 400, size=500)]
+    if args.texts:
+        with open(args.texts, encoding="utf-8") as f:
+            texts += [line.rstrip("\n") for line in f]
+    diff, label_mismatches = verify(scorer, vectorizer, model, texts)
+    print(f"checked {len(texts)} texts: max |p - p_sklearn| = {diff:.3e}, label mismatches = {label_mismatches}")
+    return 0 if diff <= args.tolerance and label_mismatches == 0 else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
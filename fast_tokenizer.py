@@ -0,0 +1,152 @@
+import json
+import sys
+import numpy as np
+
+# --- Inference tokenizer ---
+# A frozen, array-backed copy of the Keras Tokenizer used for the schizophrenia
+# LSTM. It reproduces Tokenizer.texts_to_sequences (filters, lowercasing,
+# num_words and OOV handling) and pad_sequences(padding="post",
+# truncating="post") without importing TensorFlow, and loads from a small
+# .npz instead of unpickling the Keras object. Only words below num_words are
+# kept: Keras maps every other word to the OOV id (or drops it), which is
+# exactly what an unknown word gets here. The .npz holds them as one UTF-8
+# blob plus offsets rather than a fixed-width string array.
+KERAS_DEFAULT_FILTERS = '!"#$%&()*+,-./:;<=>?@[\\]^_`{|}~\t\n'
+
+
+def pad_to_matrix(seqs, maxlen):
+    # Same output as pad_sequences(seqs, maxlen, padding="post", truncating="post")
+    matrix = np.zeros((len(seqs), maxlen), dtype=np.int32)
+    for row, seq in enumerate(seqs):
+        seq = seq[:maxlen]
+        matrix[row, :len(seq)] = seq
+    return matrix
+
+
+class FastTokenizer:
+    def __init__(self, words, ids, num_words=None, filters=KERAS_DEFAULT_FILTERS, lower=True,
+                 split=" ", char_level=False, oov_token=None):
+        self.num_words = num_words
+        self.filters = filters
+        self.lower = lower
+        self.split = split
+        self.char_level = char_level
+        self.oov_token = oov_token
+        ids = ids.tolist() if isinstance(ids, np.ndarray) else ids
+        self.index = {word: i for word, i in zip(words, ids) if not num_words or i < num_words}
+        self.unknown = self.index.get(oov_token) if oov_token is not None else None
+        self._table = str.maketrans({c: split for c in filters})
+
+    # --- Export / load ---
+    @classmethod
+    def from_keras(cls, tokenizer):
+        return cls(
+            list(tokenizer.word_index.keys()),
+            list(tokenizer.word_index.values()),
+            num_words=tokenizer.num_words,
+            filters=tokenizer.filters,
+            lower=tokenizer.lower,
+            split=tokenizer.split,
+            char_level=tokenizer.char_level,
+            oov_token=tokenizer.oov_token,
+        )
+
+    def config(self):
+        return {
+            "num_words": self.num_words,
+            "filters": self.filters,
+            "lower": self.lower,
+            "split": self.split,
+            "char_level": self.char_level,
+            "oov_token": self.oov_token,
+        }
+
+    def save(self, path):
+        encoded = [word.encode("utf-8") for word in self.index]
+        offsets = np.cumsum([0] + [len(word) for word in encoded], dtype=np.int64)
+        with open(path, "wb") as f:
+            np.savez(
+                f,
+                blob=np.frombuffer(b"".join(encoded), dtype=np.uint8),
+                offsets=offsets,
+                ids=np.fromiter(self.index.values(), dtype=np.int32, count=len(self.index)),
+                config=np.array(json.dumps(self.config())),
+            )
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path, allow_pickle=False) as data:
+            config = json.loads(str(data["config"]))
+            blob, offsets = data["blob"].tobytes(), data["offsets"].tolist()
+            words = [blob[start:end].decode("utf-8") for start, end in zip(offsets, offsets[1:])]
+            return cls(words, data["ids"], **config)
+
+    # --- Tokenization ---
+    def _tokens(self, text):
+        if self.lower:
+            text = text.lower()
+        if self.char_level:
+            return text
+        return [token for token in text.translate(self._table).split(self.split) if token]
+
+    def text_to_sequence(self, text):
+        get, unknown = self.index.get, self.unknown
+        ids = (get(token, unknown) for token in self._tokens(text))
+        return [i for i in ids if i is not None]
+
+    def texts_to_sequences(self, texts):
+        return [self.text_to_sequence(text) for text in texts]
+
+    def texts_to_matrix(self, texts, maxlen):
+        # Tokenize straight into a preallocated, post-padded int32 matrix
+        return pad_to_matrix(self.texts_to_sequences(texts), maxlen)
+
+
+# --- CLI: export and equivalence check against the Keras tokenizer ---
+SAMPLE_TEXTS = [
+    "",
+    "I feel fine today.",
+    "The VOICES keep talking to me, even at night!!!",
+    "tabs\tand\nnewlines   and    spaces",
+    "punctuation-heavy: (a) [b] {c} <d> e/f g\\h i|j ~k~ 'quotes' \"double\"",
+    "unicode café naïve 😀 straße",
+    "word " * 400,
+]
+
+
+def verify(tokenizer, fast, texts, maxlen=250):
+    from tensorflow.keras.preprocessing.sequence import pad_sequences
+    expected = tokenizer.texts_to_sequences(texts)
+    actual = fast.texts_to_sequences(texts)
+    mismatches = [i for i, (a, b) in enumerate(zip(expected, actual)) if list(a) != list(b)]
+    padded = pad_sequences(expected, maxlen=maxlen, padding="post", truncating="post")
+    matrix_equal = np.array_equal(padded, fast.texts_to_matrix(texts, maxlen))
+    return mismatches, matrix_equal
+
+
+def main(argv):
+    import argparse
+    import joblib
+    parser = argparse.ArgumentParser(description="Export or verify the fast inference tokenizer.")
+    parser.add_argument("command", choices=["export", "verify"])
+    parser.add_argument("pickle", help="path to the pickled Keras Tokenizer")
+    parser.add_argument("npz", nargs="?", help="output path for export")
+    parser.add_argument("--texts", help="file with one extra text per line to verify")
+    args = parser.parse_args(argv)
+
+    tokenizer = joblib.load(args.pickle)
+    fast = FastTokenizer.from_keras(tokenizer)
+    if args.command == "export":
+        fast.save(args.npz or args.pickle.rsplit(".", 1)[0] + ".npz")
+        return 0
+    texts = list(SAMPLE_TEXTS) + list(tokenizer.word_index)[:2000]
+    if args.texts:
+        with open(args.texts, encoding="utf-8") as f:
+            texts += [line.rstrip("\n") for line in f]
+    mismatches, matrix_equal = verify(tokenizer, fast, texts)
+    print(f"checked {len(texts)} texts: {len(mismatches)} sequence mismatches, padded matrices equal: {matrix_equal}")
+    return 0 if not mismatches and matrix_equal else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
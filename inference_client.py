@@ -0,0 +1,109 @@
+import http.client
+import json
+import os
+import socket
+import threading
+import time
+from urllib.parse import urlsplit
+import numpy as np
+
+# --- Inference service client ---
+# Talks to inference_server.py over HTTP (http://host:port) or a Unix socket
+# (unix:///path/to.sock). Each thread keeps its own keep-alive connection and
+# reconnects once if the server has closed it.
+#
+# INFERENCE_MODE="local" (the default) loads the models in this process;
+# "remote" sends scoring and embedding to the service at INFERENCE_URL so UI
+# workers never import TensorFlow or torch.
+INFERENCE_MODE = os.getenv("INFERENCE_MODE", "local")
+INFERENCE_URL = os.getenv("INFERENCE_URL", "http://127.0.0.1:8502")
+INFERENCE_TIMEOUT = float(os.getenv("INFERENCE_TIMEOUT", "30"))
+
+
+class InferenceError(RuntimeError):
+    pass
+
+
+class _UnixConnection(http.client.HTTPConnection):
+    def __init__(self, path, timeout):
+        super().__init__("localhost", timeout=timeout)
+        self.socket_path = path
+
+    def connect(self):
+        self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self.sock.settimeout(self.timeout)
+        self.sock.connect(self.socket_path)
+
+
+def connection_for(url, timeout=30.0):
+    parts = urlsplit(url)
+    if parts.scheme == "unix":
+        return _UnixConnection(parts.path, timeout)
+    if parts.scheme == "http":
+        return http.client.HTTPConnection(parts.hostname or "127.0.0.1", parts.port or 80, timeout=timeout)
+    raise ValueError(f"Unsupported inference URL: {url}")
+
+
+class InferenceClient:
+    def __init__(self, url, timeout=30.0, version_ttl=60.0):
+        self.url = url
+        self.timeout = timeout
+        self.version_ttl = version_ttl
+        self._local = threading.local()
+        self._version = None
+        self._version_at = 0.0
+
+    def _request(self, method, path, payload=None):
+        body = json.dumps(payload).encode() if payload is not None else None
+        headers = {"Content-Type": "application/json"} if body is not None else {}
+        for attempt in range(2):
+            conn = getattr(self._local, "conn", None)
+            if conn is None:
+                conn = self._local.conn = connection_for(self.url, self.timeout)
+            try:
+                conn.request(method, path, body=body, headers=headers)
+                res = conn.getresponse()
+                data = res.read()
+                break
+            except (ConnectionError, http.client.HTTPException, OSError) as e:
+                # Stale keep-alive connection: drop it and retry once on a fresh one
+                conn.close()
+                self._local.conn = None
+                if attempt:
+                    raise InferenceError(f"Inference service unreachable at {self.url}: {e}") from e
+        try:
+            result = json.loads(data) if data else {}
+        except ValueError:
+            result = {"error": data.decode(errors="replace")}
+        if res.status != 200:
+            raise InferenceError(f"Inference service returned {res.status}: {result.get('error', result)}")
+        return result
+
+    def predict(self, kind, texts):
+        # kind is "depression", "schizo" or "both"; results come back in input order
+        result = self._request("POST", f"/predict/{kind}", {"texts": list(texts)})
+        return [tuple(row) for row in result["results"]]
+
+    def embed(self, texts):
+        result = self._request("POST", "/embed", {"texts": list(texts)})
+        return np.asarray(result["vectors"], dtype=np.float32)
+
+    def health(self):
+        return self._request("GET", "/health")
+
+    def version(self):
+        # Scoring version of the models behind the service; keys the local prediction cache.
+        # /version answers while the models are still warming; if the service is
+        # briefly unreachable the last known version is kept.
+        now = time.monotonic()
+        if self._version is None or now - self._version_at > self.version_ttl:
+            try:
+                self._version = self._request("GET", "/version")["version"]
+            except InferenceError:
+                if self._version is None:
+                    raise
+            self._version_at = now
+        return self._version
+
+
+inference_client = InferenceClient(INFERENCE_URL, INFERENCE_TIMEOUT) if INFERENCE_MODE == "remote" else None
@@ -0,0 +1,149 @@
+import argparse
+import json
+import os
+import socketserver
+import sys
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlsplit
+
+# --- Inference sidecar ---
+# Serves the depression and schizophrenia models over HTTP or a Unix socket so
+# Streamlit workers can run with INFERENCE_MODE=remote and never load
+# TensorFlow themselves. Requests from every worker share this process's
+# micro-batcher, prediction cache and prediction pool.
+#   python inference_server.py --bind http://127.0.0.1:8502
+#   python inference_server.py --bind unix:///tmp/harmony-inference.sock
+#
+#   POST /predict/depression  {"texts": [...]} -> {"results": [[prob, message], ...]}
+#   POST /predict/schizo      {"texts": [...]} -> {"results": [[prob, message], ...]}
+#   POST /predict/both        {"texts": [...]} -> {"results": [[dep, schizo, message], ...]}
+#   POST /embed               {"texts": [...]} -> {"vectors": [[...], ...]} (related entries)
+#   GET  /version             -> scoring version; answers while the models warm up
+#   GET  /health              -> readiness, scoring version, batcher and cache stats
+
+# This process is the model host; never forward to another service
+os.environ["INFERENCE_MODE"] = "local"
+
+from model_registry import WARM_MODELS, is_loaded, warm_models  # noqa: E402
+import project_utils  # noqa: E402
+from related_entries import embed_texts  # noqa: E402
+
+INFERENCE_MAX_TEXTS = int(os.getenv("INFERENCE_MAX_TEXTS", "1000"))
+
+
+def predict(kind, texts):
+    if kind == "depression":
+        return project_utils.predict_many_depression(texts)
+    if kind == "schizo":
+        return project_utils.predict_many_schizo(texts)
+    if len(texts) == 1:
+        # Single-note requests from concurrent sessions coalesce in the batcher
+        return [project_utils.predict_both(texts[0])]
+    return project_utils.predict_many(texts)
+
+
+def health():
+    models = {name: is_loaded(name) for name in WARM_MODELS}
+    return {
+        "status": "ok" if all(models.values()) else "warming",
+        "version": project_utils.scoring_version(),
+        "models": models,
+        "batcher": project_utils.prediction_batcher.stats(),
+        "cache": project_utils.prediction_cache.stats(),
+    }
+
+
+class _InferenceHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # keep-alive for the client's pooled connections
+
+    def log_message(self, format, *args):
+        pass
+
+    def _reply(self, status, payload):
+        body = json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        path = self.path.rstrip("/")
+        if path == "/version":
+            self._reply(200, {"version": project_utils.scoring_version()})
+        elif path == "/health":
+            status = health()
+            self._reply(200 if status["status"] == "ok" else 503, status)
+        else:
+            self._reply(404, {"error": "not found"})
+
+    def do_POST(self):
+        path = self.path.rstrip("/")
+        if path == "/embed":
+            kind = "embed"
+        elif path in ("/predict/depression", "/predict/schizo", "/predict/both"):
+            kind = path.rsplit("/", 1)[-1]
+        else:
+            self._reply(404, {"error": "not found"})
+            return
+        try:
+            payload = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+            texts = payload["texts"]
+            if not isinstance(texts, list) or not all(isinstance(text, str) for text in texts):
+                raise ValueError("texts must be a list of strings")
+        except (KeyError, ValueError) as e:
+            self._reply(400, {"error": f"bad request: {e}"})
+            return
+        if len(texts) > INFERENCE_MAX_TEXTS:
+            self._reply(413, {"error": f"at most {INFERENCE_MAX_TEXTS} texts per request"})
+            return
+        try:
+            if kind == "embed":
+                payload = {"vectors": embed_texts(texts).tolist() if texts else []}
+            else:
+                payload = {"results": [list(row) for row in predict(kind, texts)]}
+        except Exception as e:
+            self._reply(500, {"error": str(e)})
+            return
+        self._reply(200, payload)
+
+
+class _UnixHTTPServer(socketserver.ThreadingUnixStreamServer):
+    daemon_threads = True
+
+
+class _UnixInferenceHandler(_InferenceHandler):
+    def address_string(self):
+        return "unix"
+
+
+def make_server(bind):
+    parts = urlsplit(bind)
+    if parts.scheme == "unix":
+        if os.path.exists(parts.path):
+            os.unlink(parts.path)  # stale socket from a previous run
+        return _UnixHTTPServer(parts.path, _UnixInferenceHandler)
+    if parts.scheme == "http":
+        return ThreadingHTTPServer((parts.hostname or "127.0.0.1", parts.port or 8502), _InferenceHandler)
+    raise ValueError(f"Unsupported bind address: {bind}")
+
+
+def main(argv):
+    parser = argparse.ArgumentParser(description="Serve the journal models to remote Streamlit workers.")
+    parser.add_argument("--bind", default=os.getenv("INFERENCE_URL") or "http://127.0.0.1:8502",
+                        help="http://host:port or unix:///path/to.sock")
+    args = parser.parse_args(argv)
+    warm_models()
+    server = make_server(args.bind)
+    print(f"inference service listening on {args.bind}", file=sys.stderr)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,263 @@
+import argparse
+import csv
+import json
+import os
+import sys
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from datetime import datetime
+from itertools import islice
+import requests
+from urllib3.exceptions import NewConnectionError
+from database import SUPABASE_BACKOFF, SUPABASE_RETRIES, supabase_get, supabase_post
+
+# --- Bulk journal import / export ---
+# Streams CSV or JSON Lines in both directions without holding a whole journal
+# in memory. Imports are scored in batches with predict_many and written with
+# chunked bulk inserts on a small thread pool; exports page through Journals
+# with an id keyset. Import progress is checkpointed, so --resume continues an
+# interrupted import without duplicating the chunks already written.
+#   python journal_io.py export --user-id 12 --out backup.jsonl
+#   python journal_io.py import --user-id 12 backup.jsonl --batch-size 500 --parallel 4
+
+RETRY_STATUSES = (429, 503)  # rejected before anything was written
+EXPORT_COLUMNS = ["id", "date_time", "title", "body", "pred_depression", "pred_schizophrenia", "prediction_message"]
+
+
+def _format(path, fmt):
+    if fmt != "auto":
+        return fmt
+    return "csv" if path.lower().endswith(".csv") else "jsonl"
+
+
+# --- Export ---
+def iter_notes(user_id=None, page_size=1000):
+    last_id = 0
+    while True:
+        params = {"select": ",".join(EXPORT_COLUMNS + ["user_id"]), "id": f"gt.{last_id}",
+                  "order": "id", "limit": str(page_size)}
+        if user_id is not None:
+            params["user_id"] = f"eq.{user_id}"
+        res = supabase_get("Journals", params=params)
+        res.raise_for_status()
+        page = res.json()
+        yield from page
+        if len(page) < page_size:
+            return
+        last_id = page[-1]["id"]
+
+
+def export_notes(out, fmt, user_id=None, page_size=1000):
+    columns = EXPORT_COLUMNS + ([] if user_id is not None else ["user_id"])
+    writer = csv.DictWriter(out, fieldnames=columns, extrasaction="ignore") if fmt == "csv" else None
+    if writer:
+        writer.writeheader()
+    count = 0
+    for note in iter_notes(user_id, page_size):
+        if writer:
+            writer.writerow(note)
+        else:
+            out.write(json.dumps({column: note.get(column) for column in columns}) + "\n")
+        count += 1
+    return count
+
+
+# --- Import ---
+def read_rows(f, fmt):
+    if fmt == "csv":
+        yield from csv.DictReader(f)
+    else:
+        for line in f:
+            if line.strip():
+                yield json.loads(line)
+
+
+def _to_note(row, user_id):
+    body = str(row.get("body") or "")
+    title = str(row.get("title") or "").strip() or (body.strip().splitlines() or ["Imported note"])[0]
+    return {
+        "date_time": row.get("date_time") or datetime.now().isoformat(),
+        "title": title[:100],
+        "body": body,
+        "user_id": user_id,
+    }
+
+
+def _never_sent(error):
+    # Connect timeouts and refused/unresolvable connections fail before the
+    # request goes out; aborted connections and read timeouts may not have
+    if isinstance(error, requests.ConnectTimeout):
+        return True
+    reason = getattr(error.args[0], "reason", None) if error.args else None
+    return isinstance(reason, NewConnectionError)
+
+
+def _insert_chunk(notes):
+    # Only ids come back, for the related-entries index. POST isn't retried by
+    # the shared session, so retry here, but only when the rows can't have been
+    # written: the request never went out, or PostgREST answered 429/503. A
+    # 502/504 from a gateway may arrive after the insert committed.
+    for attempt in range(SUPABASE_RETRIES + 1):
+        try:
+            res = supabase_post("Journals", params={"select": "id"}, json=notes,
+                                headers={"Prefer": "return=representation"})
+        except requests.ConnectionError as e:
+            if attempt == SUPABASE_RETRIES or not _never_sent(e):
+                raise
+        else:
+            if res.status_code == 201:
+                return [row["id"] for row in res.json()]
+            if res.status_code not in RETRY_STATUSES or attempt == SUPABASE_RETRIES:
+                raise RuntimeError(f"bulk insert failed ({res.status_code}): {res.text}")
+        time.sleep(SUPABASE_BACKOFF * 2 ** attempt)
+
+
+# --- Import checkpoint ---
+# {"path", "user_id", "offset", "done"}: every input row below `offset` is
+# written, and so are the row ranges in `done` (chunks that finished out of order).
+def load_checkpoint(path, source, user_id):
+    with open(path) as f:
+        state = json.load(f)
+    if state.get("path") != source or state.get("user_id") != user_id:
+        raise SystemExit(f"{path} belongs to an import of {state.get('path')} for user {state.get('user_id')}")
+    return state
+
+
+def save_checkpoint(path, state):
+    if not path:
+        return
+    tmp = f"{path}.tmp"
+    with open(tmp, "w") as f:
+        json.dump(state, f)
+    os.replace(tmp, path)
+
+
+def _advance(state):
+    # Fold finished ranges that touch the committed prefix into `offset`
+    state["done"].sort()
+    while state["done"] and state["done"][0][0] <= state["offset"]:
+        state["offset"] = max(state["offset"], state["done"].pop(0)[1])
+
+
+def import_notes(f, fmt, user_id, batch_size=500, parallel=4, score=True, embed=True, state=None, checkpoint=None):
+    from project_utils import predict_many
+    from related_entries import RELATED_ENTRIES, get_index, embed_texts
+    embed = embed and RELATED_ENTRIES
+    state = state or {"offset": 0, "done": []}
+    rows = enumerate(read_rows(f, fmt))
+    inserted, started = 0, time.time()
+
+    def written(i):
+        return i < state["offset"] or any(start <= i < end for start, end in state["done"])
+
+    def finish(done):
+        # Records every finished chunk, then returns the first failure (if any)
+        nonlocal inserted
+        error = None
+        for future in done:
+            start, end, notes = futures_meta.pop(future)
+            try:
+                ids = future.result()
+            except Exception as e:
+                error = error or e
+                continue
+            state["done"].append([start, end])
+            inserted += len(ids)
+            if embed:
+                try:
+                    get_index(user_id).append(ids, embed_texts([note["body"] for note in notes]))
+                except Exception as e:
+                    # The rows are written either way; related_entries.py rebuild can catch up
+                    print(f"skipped related-entries indexing for {len(ids)} notes: {e}", file=sys.stderr)
+        _advance(state)
+        save_checkpoint(checkpoint, state)
+        print(f"imported {inserted} notes ({inserted / max(time.time() - started, 1e-9):.0f} notes/s)",
+              file=sys.stderr)
+        return error
+
+    futures_meta = {}  # future -> (first row, end row, notes)
+    error = None
+    with ThreadPoolExecutor(max_workers=parallel, thread_name_prefix="import") as pool:
+        pending = set()
+        try:
+            while error is None:
+                raw = list(islice(rows, batch_size))
+                if not raw:
+                    break
+                start, end = raw[0][0], raw[-1][0] + 1
+                chunk = [_to_note(row, user_id) for i, row in raw
+                         if not written(i) and str(row.get("body") or "").strip()]
+                if not chunk:
+                    state["done"].append([start, end])
+                    continue
+                if score:
+                    # Scoring the next chunk overlaps with the inserts still in flight
+                    for note, (dep, schizo, msg) in zip(chunk, predict_many([note["body"] for note in chunk])):
+                        note.update(pred_depression=dep, pred_schizophrenia=schizo,
+                                    prediction_message=str(msg).strip() if msg else "")
+                future = pool.submit(_insert_chunk, chunk)
+                futures_meta[future] = (start, end, chunk)
+                pending.add(future)
+                if len(pending) >= parallel * 2:
+                    done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                    error = finish(done)
+        except Exception as e:
+            error = e  # bad input or a scoring failure; still record the chunks in flight
+        error = finish(wait(pending).done) or error
+    if error is not None:
+        raise RuntimeError(f"import stopped after {inserted} notes: {error}; rerun with --resume to continue") from error
+    return inserted
+
+
+def main(argv):
+    parser = argparse.ArgumentParser(description="Bulk import/export of journal entries.")
+    sub = parser.add_subparsers(dest="command", required=True)
+    exp = sub.add_parser("export", help="stream journal entries to CSV or JSON Lines")
+    scope = exp.add_mutually_exclusive_group(required=True)
+    scope.add_argument("--user-id", type=int)
+    scope.add_argument("--all", action="store_true", help="export every user's entries")
+    exp.add_argument("--out", default="-", help="output file ('-' for stdout)")
+    exp.add_argument("--format", choices=["auto", "csv", "jsonl"], default="auto")
+    exp.add_argument("--page-size", type=int, default=1000)
+    imp = sub.add_parser("import", help="stream CSV/JSON Lines entries into a user's journal")
+    imp.add_argument("path", help="input file ('-' for stdin); rows need 'body', optionally 'title' and 'date_time'")
+    imp.add_argument("--user-id", type=int, required=True)
+    imp.add_argument("--format", choices=["auto", "csv", "jsonl"], default="auto")
+    imp.add_argument("--batch-size", type=int, default=500, help="rows per scoring batch and bulk insert")
+    imp.add_argument("--parallel", type=int, default=4, help="concurrent insert requests")
+    imp.add_argument("--no-score", action="store_true", help="leave predictions empty (e.g. to run rescore.py later)")
+    imp.add_argument("--no-embed", action="store_true", help="skip the related-entries index")
+    imp.add_argument("--checkpoint", default="import_checkpoint.json", help="progress file used to resume")
+    imp.add_argument("--resume", action="store_true", help="skip rows the checkpoint records as written")
+    args = parser.parse_args(argv)
+
+    if args.command == "export":
+        fmt = _format(args.out, args.format)
+        out = sys.stdout if args.out == "-" else open(args.out, "w", newline="", encoding="utf-8")
+        try:
+            count = export_notes(out, fmt, args.user_id, args.page_size)
+        finally:
+            if out is not sys.stdout:
+                out.close()
+        print(f"exported {count} notes", file=sys.stderr)
+    else:
+        fmt = _format(args.path, args.format)
+        source = args.path if args.path == "-" else os.path.abspath(args.path)
+        if args.resume and os.path.exists(args.checkpoint):
+            state = load_checkpoint(args.checkpoint, source, args.user_id)
+        else:
+            state = {"path": source, "user_id": args.user_id, "offset": 0, "done": []}
+        f = sys.stdin if args.path == "-" else open(args.path, newline="", encoding="utf-8")
+        try:
+            count = import_notes(f, fmt, args.user_id, args.batch_size, args.parallel,
+                                 score=not args.no_score, embed=not args.no_embed,
+                                 state=state, checkpoint=args.checkpoint)
+        finally:
+            if f is not sys.stdin:
+                f.close()
+        print(f"imported {count} notes", file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
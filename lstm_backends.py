@@ -0,0 +1,166 @@
+import json
+import logging
+import os
+import sys
+import threading
+import numpy as np
+from model_registry import MAXLEN_SCHIZO, MODEL_PATH, TF_INTRA_OP_THREADS, get_model
+
+# --- LSTM inference backends ---
+# "keras"    model.predict on the original .h5 model (reference)
+# "function" a tf.function with a fixed int32 input signature (no predict() overhead)
+# "tflite"   a dynamic-range quantized TFLite model (int8 weights), cached next to the .h5
+# Non-reference backends are checked against Keras on a fixed sample; when the
+# largest probability difference exceeds LSTM_TOLERANCE the Keras backend is used.
+LSTM_BACKENDS = ["keras", "function", "tflite"]
+LSTM_BACKEND = os.getenv("LSTM_BACKEND", "keras")
+LSTM_TOLERANCE = float(os.getenv("LSTM_TOLERANCE", "0.01"))  # max |p - p_keras|
+TFLITE_PATH = os.path.splitext(MODEL_PATH)[0] + ".tflite"
+TFLITE_REPORT_PATH = TFLITE_PATH + ".json"
+
+logger = logging.getLogger("harmony.lstm")
+
+
+class KerasRunner:
+    name = "keras"
+
+    def __init__(self, model):
+        self.model = model
+
+    def __call__(self, matrix):
+        return self.model.predict(matrix, batch_size=len(matrix), verbose=0)[:, 0]
+
+
+class FunctionRunner:
+    name = "function"
+
+    def __init__(self, model):
+        import tensorflow as tf
+        dtype = model.inputs[0].dtype
+
+        @tf.function(input_signature=[tf.TensorSpec([None, None], tf.int32)])
+        def forward(x):
+            return model(tf.cast(x, dtype), training=False)
+
+        self._forward = forward
+
+    def __call__(self, matrix):
+        return self._forward(matrix).numpy()[:, 0]
+
+
+class TFLiteRunner:
+    name = "tflite"
+
+    def __init__(self, path):
+        import tensorflow as tf
+        self._interpreter = tf.lite.Interpreter(model_path=path, num_threads=TF_INTRA_OP_THREADS or None)
+        self._input = self._interpreter.get_input_details()[0]
+        self._output = self._interpreter.get_output_details()[0]
+        self._shape = None
+        self._lock = threading.Lock()  # the interpreter is not thread-safe
+
+    def __call__(self, matrix):
+        matrix = np.ascontiguousarray(matrix, dtype=self._input["dtype"])
+        with self._lock:
+            if self._shape != matrix.shape:
+                self._interpreter.resize_tensor_input(self._input["index"], matrix.shape)
+                self._interpreter.allocate_tensors()
+                self._shape = matrix.shape
+            self._interpreter.set_tensor(self._input["index"], matrix)
+            self._interpreter.invoke()
+            return self._interpreter.get_tensor(self._output["index"])[:, 0].copy()
+
+
+# --- Conversion and validation ---
+def convert_to_tflite(model, path=TFLITE_PATH):
+    import tensorflow as tf
+    converter = tf.lite.TFLiteConverter.from_keras_model(model)
+    converter.optimizations = [tf.lite.Optimize.DEFAULT]  # dynamic-range quantization
+    converter.target_spec.supported_ops = [tf.lite.OpsSet.TFLITE_BUILTINS, tf.lite.OpsSet.SELECT_TF_OPS]
+    with open(path, "wb") as f:
+        f.write(converter.convert())
+
+
+def sample_matrix(rows=64, maxlen=MAXLEN_SCHIZO, seed=0):
+    # Random in-vocabulary token rows of varied length, post-padded like real input
+    tokenizer = get_model("schizo_tokenizer")
+    vocab = tokenizer.num_words or max(tokenizer.index.values()) + 1
+    rng = np.random.default_rng(seed)
+    matrix = np.zeros((rows, maxlen), dtype=np.int32)
+    for row, length in enumerate(rng.integers(1, maxlen + 1, size=rows)):
+        matrix[row, :length] = rng.integers(1, vocab, size=length)
+    return matrix
+
+
+def max_difference(runner, reference, matrix):
+    return float(np.max(np.abs(np.asarray(runner(matrix)) - np.asarray(reference(matrix)))))
+
+
+def _source_stamp():
+    stat = os.stat(MODEL_PATH)
+    return f"{stat.st_size}:{int(stat.st_mtime)}"
+
+
+def _load_tflite():
+    # Convert and validate once per .h5; later loads only read the .tflite file
+    report = None
+    if os.path.exists(TFLITE_PATH) and os.path.exists(TFLITE_REPORT_PATH):
+        with open(TFLITE_REPORT_PATH) as f:
+            report = json.load(f)
+        if report.get("source") != _source_stamp():
+            report = None
+    if report is None:
+        model = get_model("schizo_model")
+        convert_to_tflite(model)
+        runner = TFLiteRunner(TFLITE_PATH)
+        report = {
+            "source": _source_stamp(),
+            "max_abs_diff": max_difference(runner, KerasRunner(model), sample_matrix()),
+        }
+        with open(TFLITE_REPORT_PATH, "w") as f:
+            json.dump(report, f)
+    else:
+        runner = TFLiteRunner(TFLITE_PATH)
+    return runner, report["max_abs_diff"]
+
+
+def load_runner(backend=LSTM_BACKEND):
+    if backend == "keras":
+        return KerasRunner(get_model("schizo_model"))
+    if backend == "function":
+        model = get_model("schizo_model")
+        runner = FunctionRunner(model)
+        diff = max_difference(runner, KerasRunner(model), sample_matrix())
+    elif backend == "tflite":
+        runner, diff = _load_tflite()
+    else:
+        raise ValueError(f"Unknown LSTM backend: {backend}")
+    if diff > LSTM_TOLERANCE:
+        logger.warning("%s backend differs from Keras by %.4f (> %.4f); using Keras", backend, diff, LSTM_TOLERANCE)
+        return KerasRunner(get_model("schizo_model"))
+    logger.info("Using %s LSTM backend (max |p - p_keras| = %.5f)", backend, diff)
+    return runner
+
+
+def main(argv):
+    import argparse
+    import time
+    parser = argparse.ArgumentParser(description="Validate and time the LSTM inference backends.")
+    parser.add_argument("--backend", choices=LSTM_BACKENDS[1:], default="tflite")
+    parser.add_argument("--rows", type=int, default=256)
+    args = parser.parse_args(argv)
+    reference = KerasRunner(get_model("schizo_model"))
+    runner = _load_tflite()[0] if args.backend == "tflite" else FunctionRunner(reference.model)
+    matrix = sample_matrix(args.rows)
+    diff = max_difference(runner, reference, matrix)
+    for candidate in (reference, runner):
+        start = time.perf_counter()
+        for row in matrix[:32]:
+            candidate(row[None, :])
+        print(f"{candidate.name}: {(time.perf_counter() - start) / 32 * 1000:.2f} ms per single-note call")
+    print(f"max |p - p_keras| over {args.rows} rows: {diff:.6f} (tolerance {LSTM_TOLERANCE})")
+    return 0 if diff <= LSTM_TOLERANCE else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,197 @@
+import hashlib
+import os
+import threading
+import time
+import joblib
+from tracing import span
+
+# --- Model artifacts ---
+DEPRESSION_MODEL_PATH = "models/depression_model.pkl"
+DEPRESSION_VECTORIZER_PATH = "models/depression_vectorizer.pkl"
+MODEL_PATH = "models/lstm_schizo_model.h5"  # ✅ final path after conversion
+TOKENIZER_PATH = "models/tokenizer_schizo.pkl"
+TOKENIZER_FAST_PATH = "models/tokenizer_schizo.npz"  # exported by fast_tokenizer.py
+MAXLEN_SCHIZO = 250  # padding length used during training
+
+# TensorFlow thread pools per process (0 = TensorFlow's default of one per core).
+# Lower these when several Streamlit workers share one machine.
+TF_INTRA_OP_THREADS = int(os.getenv("TF_INTRA_OP_THREADS", "0"))
+TF_INTER_OP_THREADS = int(os.getenv("TF_INTER_OP_THREADS", "0"))
+
+# Every model is loaded at most once per process, on first use, and shared by
+# all Streamlit sessions served by that process.
+PROCESS_START = time.time()
+_loaders = {}
+_models = {}
+_locks = {}
+_timings = {}
+_events = {}
+_warm_thread = None
+_warm_lock = threading.Lock()
+
+
+def _loader(name):
+    def register(fn):
+        _loaders[name] = fn
+        _locks[name] = threading.Lock()
+        return fn
+    return register
+
+
+@_loader("depression_model")
+def _load_depression_model():
+    return joblib.load(DEPRESSION_MODEL_PATH)
+
+
+@_loader("depression_vectorizer")
+def _load_depression_vectorizer():
+    return joblib.load(DEPRESSION_VECTORIZER_PATH)
+
+
+def _configure_tensorflow():
+    # Must run before TensorFlow creates its thread pools, i.e. before the first op
+    import tensorflow as tf
+    try:
+        if TF_INTRA_OP_THREADS:
+            tf.config.threading.set_intra_op_parallelism_threads(TF_INTRA_OP_THREADS)
+        if TF_INTER_OP_THREADS:
+            tf.config.threading.set_inter_op_parallelism_threads(TF_INTER_OP_THREADS)
+    except RuntimeError:
+        pass  # runtime already initialised elsewhere in this process
+
+
+@_loader("depression_scorer")
+def _load_depression_scorer():
+    # None when the pickled pipeline isn't TF-IDF + binary linear model
+    from depression_scorer import DepressionScorer
+    vectorizer = get_model("depression_vectorizer")
+    model = get_model("depression_model")
+    return DepressionScorer(vectorizer, model) if DepressionScorer.supports(vectorizer, model) else None
+
+
+@_loader("embedder")
+def _load_embedder():
+    from related_entries import EMBEDDING_MODEL
+    from sentence_transformers import SentenceTransformer
+    return SentenceTransformer(EMBEDDING_MODEL)
+
+
+@_loader("schizo_model")
+def _load_schizo_model():
+    if not os.path.exists(MODEL_PATH):
+        raise FileNotFoundError(f"❌ LSTM model not found at: {MODEL_PATH}")
+    _configure_tensorflow()
+    from tensorflow.keras.models import load_model
+    return load_model(MODEL_PATH, compile=False)
+
+
+@_loader("schizo_runner")
+def _load_schizo_runner():
+    # Callable mapping a padded int32 matrix to probabilities; see lstm_backends.py
+    from lstm_backends import load_runner
+    return load_runner()
+
+
+@_loader("schizo_tokenizer")
+def _load_schizo_tokenizer():
+    # Prefer the exported array vocabulary; build it from the Keras pickle once
+    from fast_tokenizer import FastTokenizer
+    if os.path.exists(TOKENIZER_FAST_PATH) and (
+        not os.path.exists(TOKENIZER_PATH)
+        or os.path.getmtime(TOKENIZER_FAST_PATH) >= os.path.getmtime(TOKENIZER_PATH)
+    ):
+        try:
+            return FastTokenizer.load(TOKENIZER_FAST_PATH)
+        except KeyError:
+            if not os.path.exists(TOKENIZER_PATH):
+                raise
+            # Export from an older format; rebuild it below
+    if not os.path.exists(TOKENIZER_PATH):
+        raise FileNotFoundError(f"❌ Tokenizer not found at: {TOKENIZER_PATH}")
+    tokenizer = FastTokenizer.from_keras(joblib.load(TOKENIZER_PATH))
+    try:
+        tokenizer.save(TOKENIZER_FAST_PATH)
+    except OSError:
+        pass  # read-only deploy; keep using the in-memory copy
+    return tokenizer
+
+
+def get_model(name):
+    model = _models.get(name)
+    if model is not None:
+        return model
+    with _locks[name]:
+        if name not in _models:
+            start = time.perf_counter()
+            with span("model.load", model=name):
+                _models[name] = _loaders[name]()
+            _timings[name] = round(time.perf_counter() - start, 4)
+    return _models[name]
+
+
+def is_loaded(name):
+    return name in _models
+
+
+# --- Background warm-up ---
+def _warm(names):
+    for name in names:
+        try:
+            get_model(name)
+        except Exception as e:
+            _timings[name] = f"failed: {e}"
+
+
+# The raw Keras model is loaded through schizo_runner only when its backend needs it
+WARM_MODELS = ["depression_model", "depression_vectorizer", "depression_scorer", "schizo_tokenizer", "schizo_runner"]
+
+
+def warm_models(names=None, background=True):
+    global _warm_thread
+    names = list(names or WARM_MODELS)
+    if not background:
+        _warm(names)
+        return None
+    with _warm_lock:
+        if _warm_thread is None:
+            _warm_thread = threading.Thread(target=_warm, args=(names,), name="model-warmup", daemon=True)
+            _warm_thread.start()
+    return _warm_thread
+
+
+# --- Timings ---
+def record_event(name):
+    # Seconds since process start, first occurrence only
+    _events.setdefault(name, round(time.time() - PROCESS_START, 4))
+
+
+def load_timings():
+    return {"load_seconds": dict(_timings), "events": dict(_events)}
+
+
+# --- Model version ---
+# A hash of the artifact contents, so a retrained model invalidates anything
+# keyed on the version (the prediction cache, rescore tags) while a fresh
+# checkout or container build of the same files does not.
+_model_version = None
+
+
+def _file_digest(path):
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def model_version():
+    global _model_version
+    if _model_version is None:
+        parts = []
+        for path in (DEPRESSION_MODEL_PATH, DEPRESSION_VECTORIZER_PATH, MODEL_PATH, TOKENIZER_PATH):
+            try:
+                parts.append(f"{os.path.basename(path)}:{_file_digest(path)}")
+            except OSError:
+                parts.append(f"{os.path.basename(path)}:missing")
+        _model_version = hashlib.sha256("|".join(parts).encode()).hexdigest()[:12]
+    return _model_version
@@ -0,0 +1,112 @@
+import os
+import time
+import pandas as pd
+from project_utils import PREVIEW_CHARS, NoteListingError, get_note_by_id, list_notes_page
+
+NOTE_SYNC_INTERVAL = float(os.getenv("NOTE_SYNC_INTERVAL", "30"))  # seconds between delta syncs
+NOTE_SYNC_PAGE_SIZE = 500
+
+
+# --- Session Note Store ---
+# Keeps one user's notes in memory, indexed by id. The first sync pages through
+# the projected listing; later syncs only ask for rows newer than the
+# high-water mark. The delta only sees new rows (date_time is kept on edit),
+# so edits and deletes made elsewhere show up on a forced sync, which reloads
+# everything. Local saves, patches and deletes are applied write-through, so
+# reruns that change nothing do no network I/O.
+class NoteStore:
+    def __init__(self, user_id, sync_interval=NOTE_SYNC_INTERVAL):
+        self.user_id = user_id
+        self.sync_interval = sync_interval
+        self.notes = {}
+        self.high_water_mark = None
+        self.loaded = False
+        self.last_sync = 0.0
+        self.version = 0  # bumped on every change, usable as a cache key
+        self._order = None
+
+    def _changed(self):
+        self.version += 1
+        self._order = None
+
+    def _fetch(self, since=None):
+        cursor = None
+        while True:
+            rows, cursor = list_notes_page(self.user_id, cursor, NOTE_SYNC_PAGE_SIZE, since=since, raise_errors=True)
+            yield from rows
+            if not cursor:
+                break
+
+    def sync(self, force=False):
+        if self.loaded and not force and time.monotonic() - self.last_sync < self.sync_interval:
+            return False
+        full = force or not self.loaded
+        high_water_mark = None if full else self.high_water_mark
+        try:
+            rows = list(self._fetch(since=high_water_mark))
+        except NoteListingError:
+            # Keep what we had (and its high-water mark); the next sync tries again
+            return False
+        notes = {} if full else self.notes
+        changed = full and self.loaded
+        for row in rows:
+            notes[row["id"]] = {**notes.get(row["id"], {}), **row}
+            # Only rows seen from the server move the mark; local writes do not,
+            # so notes saved by other sessions in between are never skipped
+            if high_water_mark is None or pd.Timestamp(row["date_time"]) > pd.Timestamp(high_water_mark):
+                high_water_mark = row["date_time"]
+            changed = True
+        self.notes = notes
+        self.high_water_mark = high_water_mark
+        self.loaded = True
+        self.last_sync = time.monotonic()
+        if changed:
+            self._changed()
+        return changed
+
+    def ordered(self):
+        if self._order is None:
+            self._order = sorted(
+                self.notes.values(),
+                key=lambda note: (pd.Timestamp(note["date_time"]), note["id"]),
+                reverse=True,
+            )
+        return self._order
+
+    def page(self, number, size):
+        notes = self.ordered()
+        start = number * size
+        return notes[start:start + size], start + size < len(notes)
+
+    def __len__(self):
+        return len(self.notes)
+
+    def get(self, note_id):
+        note = self.notes.get(note_id)
+        if note is not None and "body" in note:
+            return note
+        full = get_note_by_id(note_id)
+        if full is None:
+            return None
+        self.notes[note_id] = {**(note or {}), **full}
+        return self.notes[note_id]
+
+    # --- Write-through ---
+    def add(self, row):
+        row = dict(row)
+        row["preview"] = (row.get("body") or "")[:PREVIEW_CHARS]
+        self.notes[row["id"]] = row
+        self._changed()
+
+    def patch(self, note_id, fields):
+        note = self.notes.get(note_id)
+        if note is None:
+            return
+        note.update(fields)
+        if "body" in fields:
+            note["preview"] = (fields["body"] or "")[:PREVIEW_CHARS]
+        self._changed()
+
+    def remove(self, note_id):
+        if self.notes.pop(note_id, None) is not None:
+            self._changed()
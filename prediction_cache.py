@@ -0,0 +1,137 @@
+import hashlib
+import json
+import re
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+
+def normalize_body(text):
+    # The schizophrenia tokenizer splits on " " and filters "\t" and "\n" to
+    # spaces (the depression vectorizer ignores them too), so runs of exactly
+    # those characters never change a prediction; other whitespace can
+    return re.sub(r"[ \t\n]+", " ", text).strip(" \t\n")
+
+
+def cache_key(text, model_version):
+    digest = hashlib.sha256(normalize_body(text).encode("utf-8")).hexdigest()
+    return f"{model_version}:{digest}"
+
+
+# --- Prediction cache ---
+# In-memory LRU with a TTL, optionally backed by a SQLite file so entries
+# survive restarts. Expired rows are pruned from the file on open and then at
+# most every `prune_seconds` on write. Values are JSON-serialisable tuples.
+class PredictionCache:
+    def __init__(self, max_entries=2048, ttl_seconds=7 * 24 * 3600, db_path=None, prune_seconds=3600):
+        self.max_entries = max(1, int(max_entries))
+        self.ttl = float(ttl_seconds)
+        self.db_path = db_path or None
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.seconds_per_item = 0.0
+        self.saved_seconds = 0.0
+        self.prune_seconds = float(prune_seconds)
+        self._next_prune = 0.0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._db = None
+        if self.db_path:
+            self._db = sqlite3.connect(self.db_path, check_same_thread=False)
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS predictions (key TEXT PRIMARY KEY, value TEXT, created REAL)"
+            )
+            self._db.execute("CREATE INDEX IF NOT EXISTS predictions_created ON predictions (created)")
+            with self._lock:
+                self._prune()
+            self._db.commit()
+
+    def _prune(self):
+        # Caller holds the lock; drops expired rows from the SQLite tier
+        if self.ttl > 0:
+            self._db.execute("DELETE FROM predictions WHERE created < ?", (time.time() - self.ttl,))
+        self._next_prune = time.monotonic() + self.prune_seconds
+
+    def _expired(self, created):
+        return self.ttl > 0 and time.time() - created > self.ttl
+
+    def get(self, key, count=True):
+        # count=False peeks without touching the hit/miss counters
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                value, created = entry
+                if not self._expired(created):
+                    self._entries.move_to_end(key)
+                    if count:
+                        self._count_hit()
+                    return value
+                del self._entries[key]
+            if self._db is not None:
+                row = self._db.execute(
+                    "SELECT value, created FROM predictions WHERE key = ?", (key,)
+                ).fetchone()
+                if row and not self._expired(row[1]):
+                    value = tuple(json.loads(row[0]))
+                    self._remember(key, value, row[1])
+                    if count:
+                        self._count_hit(disk=True)
+                    return value
+            if count:
+                self.misses += 1
+            return None
+
+    def _count_hit(self, disk=False):
+        self.hits += 1
+        self.disk_hits += int(disk)
+        self.saved_seconds += self.seconds_per_item
+
+    def put(self, key, value):
+        created = time.time()
+        with self._lock:
+            self._remember(key, tuple(value), created)
+            if self._db is not None:
+                self._db.execute(
+                    "INSERT OR REPLACE INTO predictions (key, value, created) VALUES (?, ?, ?)",
+                    (key, json.dumps(list(value)), created),
+                )
+                if time.monotonic() >= self._next_prune:
+                    self._prune()
+                self._db.commit()
+
+    def _remember(self, key, value, created):
+        self._entries[key] = (value, created)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def record_scoring(self, items, seconds):
+        # Running average of model time per note, used to estimate time saved by hits
+        if items <= 0:
+            return
+        with self._lock:
+            per_item = seconds / items
+            if self.seconds_per_item:
+                self.seconds_per_item = 0.8 * self.seconds_per_item + 0.2 * per_item
+            else:
+                self.seconds_per_item = per_item
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            if self._db is not None:
+                self._db.execute("DELETE FROM predictions")
+                self._db.commit()
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "hits": self.hits,
+            "disk_hits": self.disk_hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+            "saved_seconds": round(self.saved_seconds, 3),
+        }
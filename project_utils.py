@@ -1,50 +1,34 @@
 import os
 import pandas as pd
-import bcrypt
 import numpy as np
-import matplotlib.pyplot as plt
-import matplotlib.dates as mdates
-import joblib
 import streamlit as st
-import requests
-from dotenv import load_dotenv
 import re
+import time
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 from scipy.special import expit  # sigmoid
-
-# --- Load environment variables ---
-load_dotenv()
-SUPABASE_URL = os.getenv("SUPABASE_URL")
-SUPABASE_KEY = os.getenv("SUPABASE_KEY")
-
-HEADERS = {
-    "apikey": SUPABASE_KEY,
-    "Authorization": f"Bearer {SUPABASE_KEY}",
-    "Content-Type": "application/json"
-}
-
-# --- Load ML Models ---
-from tensorflow.keras.models import load_model
-from tensorflow.keras.preprocessing.sequence import pad_sequences
-
-# Depression (TF-IDF + LR)
-model_depression = joblib.load("models/depression_model.pkl")
-vectorizer_depression = joblib.load("models/depression_vectorizer.pkl")
-
-# Schizophrenia (LSTM + Tokenizer)
-MODEL_PATH = "models/lstm_schizo_model.h5"  # ✅ final path after conversion
-TOKENIZER_PATH = "models/tokenizer_schizo.pkl"
-MAXLEN_SCHIZO = 250  # padding length used during training
-
-# --- File checks ---
-if not os.path.exists(MODEL_PATH):
-    raise FileNotFoundError(f"❌ LSTM model not found at: {MODEL_PATH}")
-if not os.path.exists(TOKENIZER_PATH):
-    raise FileNotFoundError(f"❌ Tokenizer not found at: {TOKENIZER_PATH}")
-
-# --- Load model and tokenizer ---
-model_schizo = load_model(MODEL_PATH, compile=False)
-tokenizer_schizo = joblib.load(TOKENIZER_PATH)
+from analytics import data_version, mark_changed
+from auth import check_password, create_user, get_user
+from batching import MicroBatcher
+from charts import CHART_BACKEND, cache_epoch, render_chart
+from database import supabase_delete, supabase_get, supabase_patch, supabase_post
+from fast_tokenizer import pad_to_matrix
+from inference_client import INFERENCE_MODE, InferenceError, inference_client
+from lstm_backends import LSTM_BACKEND
+from model_registry import MAXLEN_SCHIZO, get_model, model_version, record_event
+from prediction_cache import PredictionCache, cache_key
+from tracing import annotate, rerun_spans, span, traced
+
+# --- ML Models ---
+# Models are loaded lazily through the registry so screens that never predict
+# (e.g. login) don't pay for the TensorFlow import.
+
+# Long entries: "truncate" scores the first MAXLEN_SCHIZO tokens only (as in
+# training); "chunked" scores overlapping windows over the whole entry and
+# combines them with SCHIZO_WINDOW_REDUCER ("max", "mean" or "weighted").
+SCHIZO_SCORING = os.getenv("SCHIZO_SCORING", "truncate")
+SCHIZO_WINDOW_OVERLAP = int(os.getenv("SCHIZO_WINDOW_OVERLAP", "50"))
+SCHIZO_WINDOW_REDUCER = os.getenv("SCHIZO_WINDOW_REDUCER", "max")
 
 # --- Email Validation ---
 def is_valid_email(email: str) -> bool:
@@ -67,7 +51,7 @@ def login_screen():
             user = get_user_by_email(email)
             if not user:
                 st.error("No account found with this email.")
-            elif bcrypt.checkpw(password.encode(), user["password"].encode()):
+            elif check_password(password, user["password"]):
                 st.session_state["email"] = user["email"]
                 st.session_state["name"] = user["name"]
                 st.session_state["user_id"] = user["id"]
@@ -99,10 +83,8 @@ def login_screen():
                 st.warning("An account with this email already exists. Please log in instead.")
                 return
 
-            hashed_pw = bcrypt.hashpw(password.encode(), bcrypt.gensalt()).decode()
-            new_user = {"email": email, "name": name, "password": hashed_pw}
             try:
-                res = requests.post(f"{SUPABASE_URL}/rest/v1/Users", json=new_user, headers=HEADERS)
+                res = create_user(email, name, password)
                 if res.status_code == 201:
                     st.success("Account created successfully! You can now log in.")
                 else:
@@ -112,10 +94,7 @@ def login_screen():
 # --- Auth Helpers ---
 def get_user_by_email(email):
     try:
-        url = f"{SUPABASE_URL}/rest/v1/Users?email=eq.{email}&select=*"
-        res = requests.get(url, headers=HEADERS)
-        data = res.json()
-        return data[0] if data else None
+        return get_user(email)
     except Exception as e:
         st.error(f"Failed to get user: {e}")
         return None
@@ -124,7 +103,7 @@ def handle_login(user, email, password):
     if not user:
         st.error("No account found with this email.")
         return
-    if bcrypt.checkpw(password.encode(), user["password"].encode()):
+    if check_password(password, user["password"]):
         st.session_state["email"] = user["email"]
         st.session_state["name"] = user["name"]
         st.session_state["user_id"] = user["id"]
@@ -139,10 +118,8 @@ def handle_register(user, email, name, password):
     if user:
         st.warning("An account with this email already exists. Please login instead.")
         return
-    hashed_pw = bcrypt.hashpw(password.encode(), bcrypt.gensalt()).decode()
-    new_user = {"email": email, "name": name, "password": hashed_pw}
     try:
-        res = requests.post(f"{SUPABASE_URL}/rest/v1/Users", json=new_user, headers=HEADERS)
+        res = create_user(email, name, password)
         if res.status_code == 201:
             st.success("Account created successfully! You can now log in.")
         else:
@@ -151,56 +128,211 @@ def handle_register(user, email, name, password):
         st.error(f"Failed to register: {str(e)}")
 
 # --- Predict Depression (TF-IDF + LR) ---
-def predict_label_depression(text):
-    if text.strip() == "":
-        return 0.0, "Unknown"
-    vec = vectorizer_depression.transform([text])
-    pred = model_depression.predict(vec)[0]
-    probs = model_depression.predict_proba(vec)[0]
-    confidence_score = str(round(np.max(probs)*100, 2))
-    prob_depressed = round(float(probs[1])*100, 2)
-    to_be_printed_dep = (
-        f"{confidence_score} % confident Depressed"
-        if pred == 1 else
-        f"{confidence_score} % confident Not Depressed"
-    )
-    return prob_depressed, to_be_printed_dep
-
-# --- Predict Schizophrenia (TF-IDF + SVM) ---
-from tensorflow.keras.preprocessing.sequence import pad_sequences
-
-def predict_label_schizo(text, maxlen=250):
-    if text.strip() == "":
-        return 0.0, "Unknown"
-
-    # Tokenize and pad using the same logic as in training
-    seq = tokenizer_schizo.texts_to_sequences([text])
-    padded = pad_sequences(seq, maxlen=maxlen, padding="post", truncating="post")
-
-    # Predict using the LSTM model
-    prob = float(model_schizo.predict(padded, verbose=0)[0][0])
-    pred = 1 if prob >= 0.5 else 0  # Adjust threshold if needed
-
-    # Format the output
-    confidence_score = round(prob * 100, 2) if pred == 1 else round((1 - prob) * 100, 2)
-    prob_schizo = round(prob * 100, 2)
-    message = (
-        f"{confidence_score} % confident Schizophrenic"
-        if pred == 1 else
-        f"{confidence_score} % confident Not Schizophrenic"
-    )
-    return prob_schizo, message
-
+@traced("predict.depression")
+def predict_many_depression(texts):
+    if inference_client is not None:
+        return inference_client.predict("depression", texts)
+    results = [(0.0, "Unknown")] * len(texts)
+    idx = [i for i, text in enumerate(texts) if text.strip()]
+    if not idx:
+        return results
+    batch = [texts[i] for i in idx]
+    scorer = get_model("depression_scorer")
+    if scorer is not None:
+        # One sparse dot product + sigmoid; labels follow from the probability
+        prob, preds = scorer.predict(batch)
+        probs = np.column_stack([1 - prob, prob])
+    else:
+        model_depression = get_model("depression_model")
+        vectorizer_depression = get_model("depression_vectorizer")
+        vec = vectorizer_depression.transform(batch)
+        preds = model_depression.predict(vec)
+        probs = model_depression.predict_proba(vec)
+    for i, pred, row in zip(idx, preds, probs):
+        confidence_score = str(round(np.max(row)*100, 2))
+        prob_depressed = round(float(row[1])*100, 2)
+        to_be_printed_dep = (
+            f"{confidence_score} % confident Depressed"
+            if pred == 1 else
+            f"{confidence_score} % confident Not Depressed"
+        )
+        results[i] = (prob_depressed, to_be_printed_dep)
+    return results
 
+def predict_label_depression(text):
+    return predict_many_depression([text])[0]
+
+# --- Predict Schizophrenia (LSTM + Tokenizer) ---
+def _window_starts(length, maxlen, overlap):
+    # Overlapping windows covering the whole sequence; the last one ends on the final token
+    if length <= maxlen:
+        return [0]
+    stride = max(1, maxlen - overlap)
+    return list(range(0, length - maxlen, stride)) + [length - maxlen]
+
+def _reduce_windows(probs, starts, maxlen, reducer):
+    if reducer == "max":
+        return float(probs.max())
+    if reducer == "mean":
+        return float(probs.mean())
+    if reducer == "weighted":
+        # Weight each window by the tokens it adds beyond the previous window,
+        # so every token of the entry counts exactly once
+        ends = np.asarray(starts) + maxlen
+        weights = np.diff(np.concatenate(([0], ends))).astype(float)
+        return float(np.average(probs, weights=weights))
+    raise ValueError(f"Unknown window reducer: {reducer}")
+
+@traced("predict.schizo")
+def predict_many_schizo(texts, maxlen=MAXLEN_SCHIZO, scoring=None, overlap=None, reducer=None):
+    if inference_client is not None:
+        # Scoring settings are the service's own
+        return inference_client.predict("schizo", texts)
+    scoring = scoring or SCHIZO_SCORING
+    overlap = SCHIZO_WINDOW_OVERLAP if overlap is None else overlap
+    reducer = reducer or SCHIZO_WINDOW_REDUCER
+    results = [(0.0, "Unknown")] * len(texts)
+    idx = [i for i, text in enumerate(texts) if text.strip()]
+    if not idx:
+        return results
+
+    model_schizo = get_model("schizo_runner")
+    tokenizer_schizo = get_model("schizo_tokenizer")
+
+    # Tokenize and pad the whole batch using the same logic as in training
+    batch = [texts[i] for i in idx]
+    if scoring == "chunked":
+        seqs = tokenizer_schizo.texts_to_sequences(batch)
+        starts = [_window_starts(len(seq), maxlen, overlap) for seq in seqs]
+        windows = [seq[s:s + maxlen] for seq, seq_starts in zip(seqs, starts) for s in seq_starts]
+        padded = pad_to_matrix(windows, maxlen)
+    else:
+        padded = tokenizer_schizo.texts_to_matrix(batch, maxlen)
+
+    # One forward pass for every window of every entry in the batch
+    window_probs = model_schizo(padded)
+    if scoring == "chunked":
+        offsets = np.cumsum([0] + [len(s) for s in starts])
+        probs = [
+            _reduce_windows(window_probs[offsets[n]:offsets[n + 1]], starts[n], maxlen, reducer)
+            for n in range(len(seqs))
+        ]
+    else:
+        probs = window_probs
+    for i, prob in zip(idx, probs):
+        prob = float(prob)
+        pred = 1 if prob >= 0.5 else 0  # Adjust threshold if needed
+
+        # Format the output
+        confidence_score = round(prob * 100, 2) if pred == 1 else round((1 - prob) * 100, 2)
+        prob_schizo = round(prob * 100, 2)
+        message = (
+            f"{confidence_score} % confident Schizophrenic"
+            if pred == 1 else
+            f"{confidence_score} % confident Not Schizophrenic"
+        )
+        results[i] = (prob_schizo, message)
+    return results
+
+def predict_label_schizo(text, maxlen=MAXLEN_SCHIZO):
+    return predict_many_schizo([text], maxlen=maxlen)[0]
+
+def scoring_version():
+    # Model version plus any setting that changes scores; keys cached predictions
+    if inference_client is not None:
+        return inference_client.version()
+    version = model_version()
+    if LSTM_BACKEND != "keras":
+        version = f"{version}-{LSTM_BACKEND}"
+    if SCHIZO_SCORING == "chunked":
+        version = f"{version}-chunked-{SCHIZO_WINDOW_OVERLAP}-{SCHIZO_WINDOW_REDUCER}"
+    return version
+
+
+# --- Prediction Thread Pool ---
+# Shared by all sessions in the process so concurrent saves can't oversubscribe cores
+PREDICT_THREADS = int(os.getenv("PREDICT_THREADS", "2"))
+prediction_pool = ThreadPoolExecutor(max_workers=PREDICT_THREADS, thread_name_prefix="predict")
+
+# --- Prediction Cache ---
+# Keyed by a hash of the normalized body plus the model version, so unchanged
+# bodies (title-only edits, re-saves, duplicate imports) are never re-scored.
+prediction_cache = PredictionCache(
+    max_entries=int(os.getenv("PREDICTION_CACHE_SIZE", "2048")),
+    ttl_seconds=float(os.getenv("PREDICTION_CACHE_TTL", str(7 * 24 * 3600))),
+    db_path=os.getenv("PREDICTION_CACHE_DB"),
+)
 
 # --- Predict Both ---
+@traced("predict.many")
+def predict_many(texts):
+    texts = list(texts)
+    results = [(0.0, 0.0, "")] * len(texts)  # Blank inputs get an empty message
+    version = scoring_version()
+    pending = {}  # cache key -> indices waiting on that body
+    for i, text in enumerate(texts):
+        if not text.strip():
+            continue
+        key = cache_key(text, version)
+        if key in pending:
+            pending[key].append(i)
+            continue
+        cached = prediction_cache.get(key)
+        if cached is not None:
+            results[i] = cached
+        else:
+            pending[key] = [i]
+    annotate(notes=len(texts), cache_hits=sum(1 for r in results if r[2]), scored=len(pending))
+    if not pending:
+        return results
+
+    keys = list(pending)
+    batch = [texts[pending[key][0]] for key in keys]
+    start = time.perf_counter()
+    if inference_client is not None:
+        scored = inference_client.predict("both", batch)
+    else:
+        # The LR path overlaps with the LSTM forward pass; latency is the slower of the two
+        schizo_future = prediction_pool.submit(predict_many_schizo, batch)
+        depression_future = prediction_pool.submit(predict_many_depression, batch)
+        schizo, depression = schizo_future.result(), depression_future.result()
+        scored = [
+            (prob_dep, prob_schizo, f"{to_be_printed_schizo} and {to_be_printed_dep}")
+            for (prob_schizo, to_be_printed_schizo), (prob_dep, to_be_printed_dep) in zip(schizo, depression)
+        ]
+    prediction_cache.record_scoring(len(batch), time.perf_counter() - start)
+    for key, prediction in zip(keys, scored):
+        prediction_cache.put(key, prediction)
+        for i in pending[key]:
+            results[i] = prediction
+    record_event("first_prediction")
+    return results
+
+# Concurrent save/update requests from all sessions share one batch queue
+PREDICT_BATCH_MAX_SIZE = int(os.getenv("PREDICT_BATCH_MAX_SIZE", "32"))
+PREDICT_BATCH_MAX_WAIT_MS = float(os.getenv("PREDICT_BATCH_MAX_WAIT_MS", "5"))
+prediction_batcher = MicroBatcher(
+    predict_many,
+    max_batch_size=PREDICT_BATCH_MAX_SIZE,
+    max_wait_ms=PREDICT_BATCH_MAX_WAIT_MS,
+    name="prediction-batcher",
+)
+
+def cached_prediction(text):
+    # Prediction for `text` if it is already cached, without scoring it
+    if not text.strip():
+        return 0.0, 0.0, ""
+    try:
+        version = scoring_version()
+    except InferenceError:
+        return None  # inference service down; callers fall back to background scoring
+    return prediction_cache.get(cache_key(text, version), count=False)
+
+@traced("predict.both")
 def predict_both(text):
     if not text.strip():
         return 0.0, 0.0, ""  # Return an empty message if input is blank
-    schizo, to_be_printed_schizo = predict_label_schizo(text)
-    depression, to_be_printed_dep = predict_label_depression(text)
-    msg = f"{to_be_printed_schizo} and {to_be_printed_dep}"
-    return depression, schizo, msg
+    return prediction_batcher.submit(text)
 
 
 # --- Preview Text ---
@@ -210,27 +342,55 @@ def preview(text, lines=2):
     return short + ("..." if len(lines_list) > lines else "")
 
 # --- Supabase: Note Storage ---
-def save_note_to_supabase(title, body, pred_depression, pred_schizophrenia, prediction_message):
-    new_note = {
+def build_note(title, body, pred_depression, pred_schizophrenia, prediction_message, user_id=None):
+    return {
         "date_time": datetime.now().isoformat(),
         "title": title,
         "body": body,
         "pred_depression": pred_depression,
         "pred_schizophrenia": pred_schizophrenia,
         "prediction_message": str(prediction_message).strip() if prediction_message else "",
-        "user_id": st.session_state["user_id"]
+        "user_id": user_id or st.session_state["user_id"]
     }
+
+def save_note_to_supabase(title, body, pred_depression, pred_schizophrenia, prediction_message, user_id=None):
+    new_note = build_note(title, body, pred_depression, pred_schizophrenia, prediction_message, user_id)
     try:
-        res = requests.post(f"{SUPABASE_URL}/rest/v1/Journals", json=new_note, headers=HEADERS)
+        # Ask for the inserted row back so callers get its id without a refetch
+        res = supabase_post("Journals", json=new_note, headers={"Prefer": "return=representation"})
         if res.status_code != 201:
             st.error(f"Failed to save note: {res.text}")
+            return None
+        mark_changed(new_note["user_id"])
+        data = res.json()
+        return data[0] if data else None
     except Exception as e:
         st.error(f"Failed to save note: {e}")
+        return None
 
-def get_notes_from_supabase():
+def update_note_in_supabase(note_id, fields, user_id=None):
+    # PATCH only the changed columns; the row keeps its id and date_time
+    if not fields:
+        return True
+    if "prediction_message" in fields:
+        msg = fields["prediction_message"]
+        fields = {**fields, "prediction_message": str(msg).strip() if msg else ""}
     try:
-        url = f"{SUPABASE_URL}/rest/v1/Journals?user_id=eq.{st.session_state['user_id']}&order=date_time.desc"
-        res = requests.get(url, headers=HEADERS)
+        url = f"Journals?id=eq.{note_id}"
+        res = supabase_patch(url, json=fields)
+        if res.status_code not in (200, 204):
+            st.error(f"Failed to update note: {res.text}")
+            return False
+        mark_changed(user_id or st.session_state["user_id"])
+        return True
+    except Exception as e:
+        st.error(f"Failed to update note: {e}")
+        return False
+
+def get_notes_from_supabase(user_id=None):
+    try:
+        url = f"Journals?user_id=eq.{user_id or st.session_state['user_id']}&order=date_time.desc"
+        res = supabase_get(url)
         if res.status_code == 200:
             return pd.DataFrame(res.json())
         else:
@@ -240,58 +400,156 @@ def get_notes_from_supabase():
         st.error(f"Error loading notes: {e}")
         return pd.DataFrame()
 
-def delete_note_from_supabase(note_id):
+# --- Supabase: Paginated Note Listing ---
+NOTES_PAGE_SIZE = int(os.getenv("NOTES_PAGE_SIZE", "24"))
+PREVIEW_CHARS = 200  # keep in sync with supabase/journal_preview.sql
+NOTE_LIST_COLUMNS = "id,title,date_time,pred_depression,preview"  # pred_depression drives the pending marker
+# When the preview() computed column isn't installed, listings fall back to
+# fetching bodies and truncating client-side, and re-check after a while
+PREVIEW_RETRY_SECONDS = 600
+_preview_missing_until = 0.0
+
+def _missing_preview(res):
+    # Only an unknown column/function named "preview" means the migration is missing
+    try:
+        error = res.json()
+    except ValueError:
+        return False
+    return (
+        isinstance(error, dict)
+        and error.get("code") in ("42703", "42883", "PGRST200", "PGRST204")
+        and "preview" in f"{error.get('message', '')} {error.get('details', '')} {error.get('hint', '')}"
+    )
+
+def _keyset_filter(cursor):
+    # Rows strictly after (date_time, id) in date_time.desc,id.desc order
+    date_time, note_id = cursor
+    return f'(date_time.lt."{date_time}",and(date_time.eq."{date_time}",id.lt.{note_id}))'
+
+class NoteListingError(Exception):
+    pass
+
+def list_notes_page(user_id=None, cursor=None, limit=NOTES_PAGE_SIZE, since=None, raise_errors=False):
+    # `since` restricts the listing to rows newer than that date_time (delta sync).
+    # Failures are shown with st.error; with raise_errors they also raise
+    # NoteListingError instead of returning an empty page.
+    global _preview_missing_until
+    user_id = user_id or st.session_state["user_id"]
+    use_preview = time.monotonic() >= _preview_missing_until
+    columns = NOTE_LIST_COLUMNS if use_preview else NOTE_LIST_COLUMNS.replace("preview", "body")
+    params = {
+        "user_id": f"eq.{user_id}",
+        "select": columns,
+        "order": "date_time.desc,id.desc",
+        "limit": str(limit + 1),  # one extra row tells us whether there is a next page
+    }
+    if cursor:
+        params["or"] = _keyset_filter(cursor)
+    if since:
+        params["date_time"] = f"gt.{since}"  # plain filters take the value unquoted
     try:
-        url = f"{SUPABASE_URL}/rest/v1/Journals?id=eq.{note_id}"
-        res = requests.delete(url, headers=HEADERS)
+        res = supabase_get("Journals", params=params)
+        if res.status_code == 400 and use_preview and _missing_preview(res):
+            # preview() computed column not installed yet; truncate client-side
+            _preview_missing_until = time.monotonic() + PREVIEW_RETRY_SECONDS
+            return list_notes_page(user_id, cursor, limit, since, raise_errors)
+        if res.status_code != 200:
+            st.error(f"Failed to fetch notes: {res.text}")
+            if raise_errors:
+                raise NoteListingError(res.text)
+            return [], None
+        rows = res.json()
+    except NoteListingError:
+        raise
+    except Exception as e:
+        st.error(f"Error loading notes: {e}")
+        if raise_errors:
+            raise NoteListingError(str(e)) from e
+        return [], None
+    for row in rows:
+        if "body" in row:
+            row["preview"] = (row.pop("body") or "")[:PREVIEW_CHARS]
+        row["preview"] = row.get("preview") or ""
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = (rows[-1]["date_time"], rows[-1]["id"])
+    return rows, next_cursor
+
+def get_note_by_id(note_id):
+    try:
+        res = supabase_get(f"Journals?id=eq.{note_id}&select=*")
+        if res.status_code != 200:
+            st.error(f"Failed to fetch note: {res.text}")
+            return None
+        data = res.json()
+        return data[0] if data else None
+    except Exception as e:
+        st.error(f"Error loading note: {e}")
+        return None
+
+def delete_note_from_supabase(note_id, user_id=None):
+    try:
+        url = f"Journals?id=eq.{note_id}"
+        res = supabase_delete(url)
         if res.status_code != 204:
             st.error(f"Failed to delete note: {res.text}")
+            return False
+        mark_changed(user_id or st.session_state["user_id"])
+        return True
     except Exception as e:
         st.error(f"Failed to delete note: {e}")
+        return False
 
 # --- Streamlit Plots ---
-def show_analysis_depression():
+def show_analysis(metric="Depression", bucket="All entries", backend=CHART_BACKEND, version=None):
+    # `version` identifies the data being plotted (defaults to this process's write counter);
+    # the cache epoch bounds how long writes made elsewhere can go unseen
+    user_id = st.session_state["user_id"]
     try:
-        url = f"{SUPABASE_URL}/rest/v1/Journals?user_id=eq.{st.session_state['user_id']}&select=date_time,pred_depression&order=date_time"
-        res = requests.get(url, headers=HEADERS)
-        data = res.json()
-        if not data:
-            st.info("No data available for depression analysis.")
-            return
-        df = pd.DataFrame(data)
-        df['date_time'] = pd.to_datetime(df['date_time'])
-        plt.figure(figsize=(9, 4))
-        plt.plot(df['date_time'], df['pred_depression'], marker='o', linestyle='-', color='blue')
-        plt.xlabel('Date & Time')
-        plt.ylabel('Depression Probability')
-        plt.title('Depression Analysis Over Time')
-        plt.grid(True)
-        plt.xticks(rotation=45)
-        plt.gca().xaxis.set_major_formatter(mdates.DateFormatter('%d %B %y, %H:%M'))
-        plt.tight_layout()
-        st.pyplot(plt)
+        version = (data_version(user_id) if version is None else version, cache_epoch())
+        with span("chart.show", metric=metric, bucket=bucket, backend=backend) as record:
+            hits = render_chart.cache_info().hits
+            output = render_chart(user_id, metric, bucket, backend, version)
+            record["cache_hits"] = render_chart.cache_info().hits - hits
+            if isinstance(output, bytes):
+                record["bytes"] = len(output)
+        if output is None:
+            st.info(f"No data available for {metric.lower()} analysis.")
+        elif backend == "native":
+            st.line_chart(output)
+        elif backend == "svg":
+            st.image(output.decode("utf-8"))
+        else:
+            st.image(output)
     except Exception as e:
-        st.error(f"Error loading depression analysis: {e}")
+        st.error(f"Error loading {metric.lower()} analysis: {e}")
+
+def show_analysis_depression():
+    show_analysis("Depression")
 
 def show_analysis_schizo():
-    try:
-        url = f"{SUPABASE_URL}/rest/v1/Journals?user_id=eq.{st.session_state['user_id']}&select=date_time,pred_schizophrenia&order=date_time"
-        res = requests.get(url, headers=HEADERS)
-        data = res.json()
-        if not data:
-            st.info("No data available for schizophrenia analysis.")
-            return
-        df = pd.DataFrame(data)
-        df['date_time'] = pd.to_datetime(df['date_time'])
-        plt.figure(figsize=(9, 4))
-        plt.plot(df['date_time'], df['pred_schizophrenia'], marker='o', linestyle='-', color='blue')
-        plt.xlabel('Date & Time')
-        plt.ylabel('Schizophrenia Probability')
-        plt.title('Schizophrenia Analysis Over Time')
-        plt.grid(True)
-        plt.xticks(rotation=45)
-        plt.gca().xaxis.set_major_formatter(mdates.DateFormatter('%d %B %y, %H:%M'))
-        plt.tight_layout()
-        st.pyplot(plt)
-    except Exception as e:
-        st.error(f"Error loading schizophrenia analysis: {e}")
+    show_analysis("Schizophrenia")
+
+# --- Developer Panel ---
+# Opt-in (HARMONY_DEV_PANEL=1) per-rerun timing breakdown in the sidebar
+DEV_PANEL = os.getenv("HARMONY_DEV_PANEL", "0") == "1"
+
+def show_dev_panel(container):
+    from model_registry import load_timings
+    spans = rerun_spans()
+    with container.container():
+        st.markdown("### Developer")
+        total = sum(s["ms"] for s in spans if s["depth"] == 0)
+        st.caption(f"{len(spans)} spans, {total:.1f} ms traced this rerun")
+        if spans:
+            df = pd.DataFrame(spans)
+            df["name"] = ["  " * depth + name for depth, name in zip(df["depth"], df["name"])]
+            st.dataframe(df.drop(columns=["depth", "thread"]), hide_index=True)
+        with st.expander("Caches and models"):
+            st.json({
+                "prediction_cache": prediction_cache.stats(),
+                "prediction_batcher": prediction_batcher.stats(),
+                "chart_cache": render_chart.cache_info()._asdict(),
+                "models": load_timings(),
+            })
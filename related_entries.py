@@ -0,0 +1,244 @@
+import json
+import os
+import shutil
+import sys
+import threading
+import numpy as np
+
+# --- Related entries ---
+# Each journal body is embedded once (in the background, at save time) and
+# appended to a per-user, memory-mapped float16 index:
+#   <EMBEDDINGS_DIR>/<user_id>/vectors.f16   unit-length vectors, row-major
+#   <EMBEDDINGS_DIR>/<user_id>/ids.i64       note id for every row
+#   <EMBEDDINGS_DIR>/<user_id>/deleted.i64   tombstoned note ids
+#   <EMBEDDINGS_DIR>/<user_id>/meta.json     {"dim": ..., "model": ...}
+# Re-embedding an edited note appends a new row; only the newest row per id
+# is searched. Reads never compute embeddings: a note's own stored vector is
+# the query.
+RELATED_ENTRIES = os.getenv("RELATED_ENTRIES", "1") == "1"
+EMBEDDINGS_DIR = os.getenv("EMBEDDINGS_DIR", "data/embeddings")
+EMBEDDING_MODEL = os.getenv("EMBEDDING_MODEL", "all-MiniLM-L6-v2")
+SEARCH_CHUNK_ROWS = 16384  # rows converted to float32 at a time during search
+
+_user_locks = {}
+_user_locks_lock = threading.Lock()
+_indexes = {}  # user_id -> EmbeddingIndex, so mapped files are reused across reruns
+
+
+def _lock_for(path):
+    with _user_locks_lock:
+        return _user_locks.setdefault(path, threading.Lock())
+
+
+def _normalize(vectors):
+    vectors = np.asarray(vectors, dtype=np.float32)
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    return vectors / np.where(norms > 0, norms, 1.0)
+
+
+class EmbeddingIndex:
+    def __init__(self, user_id, root=EMBEDDINGS_DIR):
+        self.path = os.path.join(root, str(user_id))
+        self._lock = _lock_for(self.path)
+        self._snapshot = None  # (file sizes, vectors, ids, live)
+
+    def _file(self, name):
+        return os.path.join(self.path, name)
+
+    def meta(self):
+        try:
+            with open(self._file("meta.json")) as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return None
+
+    # --- Writes (append-only) ---
+    def append(self, note_ids, vectors, model=EMBEDDING_MODEL):
+        vectors = _normalize(vectors).astype(np.float16)
+        note_ids = np.asarray(note_ids, dtype=np.int64)
+        with self._lock:
+            os.makedirs(self.path, exist_ok=True)
+            meta = self.meta()
+            if meta is None:
+                with open(self._file("meta.json"), "w") as f:
+                    json.dump({"dim": int(vectors.shape[1]), "model": model}, f)
+            elif meta["dim"] != vectors.shape[1]:
+                raise ValueError(f"Index dimension is {meta['dim']}, got {vectors.shape[1]}; rebuild the index")
+            # Vectors first: a crash between the two writes leaves an unreferenced row, never a bad id
+            with open(self._file("vectors.f16"), "ab") as f:
+                f.write(vectors.tobytes())
+            with open(self._file("ids.i64"), "ab") as f:
+                f.write(note_ids.tobytes())
+
+    def remove(self, note_id):
+        if not os.path.isdir(self.path):
+            return
+        with self._lock, open(self._file("deleted.i64"), "ab") as f:
+            f.write(np.asarray([note_id], dtype=np.int64).tobytes())
+
+    # --- Reads ---
+    def _sizes(self):
+        return tuple(os.path.getsize(self._file(name)) if os.path.exists(self._file(name)) else 0
+                     for name in ("vectors.f16", "ids.i64", "deleted.i64"))
+
+    def _load(self):
+        # Returns a consistent (vectors, ids, live) snapshot, re-mapped only when
+        # the files grew. Built under the lock and published as one tuple, so
+        # concurrent readers never see arrays from different loads.
+        snapshot = self._snapshot
+        sizes = self._sizes()
+        if snapshot is not None and snapshot[0] == sizes:
+            return snapshot[1:]
+        with self._lock:
+            sizes = self._sizes()
+            if self._snapshot is not None and self._snapshot[0] == sizes:
+                return self._snapshot[1:]
+            meta = self.meta()
+            if meta is None or not sizes[0]:
+                vectors = np.zeros((0, 0), dtype=np.float16)
+                ids = np.zeros(0, dtype=np.int64)
+                live = np.zeros(0, dtype=bool)
+            else:
+                dim = meta["dim"]
+                count = min(sizes[0] // (2 * dim), sizes[1] // 8)
+                vectors = np.memmap(self._file("vectors.f16"), dtype=np.float16, mode="r", shape=(count, dim))
+                ids = np.fromfile(self._file("ids.i64"), dtype=np.int64, count=count)
+                # Live rows: newest row for each id, minus tombstoned ids
+                _, last_from_end = np.unique(ids[::-1], return_index=True)
+                live = np.zeros(count, dtype=bool)
+                live[count - 1 - last_from_end] = True
+                if sizes[2]:
+                    live &= ~np.isin(ids, np.fromfile(self._file("deleted.i64"), dtype=np.int64))
+            self._snapshot = (sizes, vectors, ids, live)
+            return vectors, ids, live
+
+    def __len__(self):
+        _, _, live = self._load()
+        return int(live.sum())
+
+    def vector_for(self, note_id):
+        vectors, ids, live = self._load()
+        rows = np.flatnonzero((ids == note_id) & live)
+        return np.asarray(vectors[rows[-1]], dtype=np.float32) if len(rows) else None
+
+    def search(self, query, k=5, exclude=()):
+        # Cosine similarity against every live row; returns [(note_id, score)] best first
+        vectors, ids, live = self._load()
+        count = len(ids)
+        if not count:
+            return []
+        query = _normalize(np.atleast_2d(query))[0]
+        scores = np.empty(count, dtype=np.float32)
+        for start in range(0, count, SEARCH_CHUNK_ROWS):
+            block = np.asarray(vectors[start:start + SEARCH_CHUNK_ROWS], dtype=np.float32)
+            scores[start:start + len(block)] = block @ query
+        scores[~live] = -np.inf
+        if len(exclude):
+            scores[np.isin(ids, np.asarray(list(exclude), dtype=np.int64))] = -np.inf
+        k = min(k, int(np.isfinite(scores).sum()))
+        if k <= 0:
+            return []
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top])]
+        return [(int(ids[i]), float(scores[i])) for i in top]
+
+
+def get_index(user_id):
+    index = _indexes.get(user_id)
+    if index is None:
+        index = _indexes.setdefault(user_id, EmbeddingIndex(user_id))
+    return index
+
+
+# --- Embedding ---
+def embed_texts(texts, batch_size=64):
+    from inference_client import inference_client
+    if inference_client is not None:
+        return inference_client.embed(texts)
+    from model_registry import get_model
+    model = get_model("embedder")
+    return model.encode(list(texts), batch_size=batch_size, convert_to_numpy=True, normalize_embeddings=True)
+
+
+def index_note(user_id, note_id, body):
+    index_notes(user_id, [(note_id, body)])
+
+
+def index_notes(user_id, notes):
+    # notes: [(note_id, body), ...], embedded in one batch
+    notes = [(note_id, body) for note_id, body in notes if body.strip()]
+    if not RELATED_ENTRIES or not notes:
+        return
+    get_index(user_id).append([note_id for note_id, _ in notes], embed_texts([body for _, body in notes]))
+
+
+def remove_note(user_id, note_id):
+    if RELATED_ENTRIES:
+        get_index(user_id).remove(note_id)
+
+
+def related_notes(user_id, note_id, k=5):
+    # Empty when the note hasn't been embedded yet
+    index = get_index(user_id)
+    query = index.vector_for(note_id)
+    if query is None:
+        return []
+    return index.search(query, k, exclude=[note_id])
+
+
+# --- CLI: rebuild a user's index from Supabase ---
+def rebuild(user_id, page_size=1000, batch_size=64, root=EMBEDDINGS_DIR):
+    from database import supabase_get
+    final = EmbeddingIndex(user_id, root)
+    tmp_root = os.path.join(root, f".rebuild-{user_id}")
+    shutil.rmtree(tmp_root, ignore_errors=True)
+    index = EmbeddingIndex(user_id, tmp_root)
+    last_id, total = 0, 0
+    while True:
+        res = supabase_get("Journals", params={
+            "user_id": f"eq.{user_id}",
+            "select": "id,body",
+            "id": f"gt.{last_id}",
+            "order": "id",
+            "limit": str(page_size),
+        })
+        res.raise_for_status()
+        page = res.json()
+        rows = [row for row in page if (row.get("body") or "").strip()]
+        if not page:
+            break
+        if rows:
+            index.append([row["id"] for row in rows], embed_texts([row["body"] for row in rows], batch_size))
+        last_id, total = page[-1]["id"], total + len(rows)
+        print(f"embedded {total} notes")
+        if len(page) < page_size:
+            break
+    # Swap the finished index into place
+    with final._lock:
+        old = final.path + ".old"
+        shutil.rmtree(old, ignore_errors=True)
+        if os.path.exists(final.path):
+            os.replace(final.path, old)
+        if os.path.exists(index.path):
+            os.replace(index.path, final.path)
+        shutil.rmtree(old, ignore_errors=True)
+        shutil.rmtree(tmp_root, ignore_errors=True)
+    return total
+
+
+def main(argv):
+    import argparse
+    parser = argparse.ArgumentParser(description="Manage the related-entries embedding index.")
+    sub = parser.add_subparsers(dest="command", required=True)
+    build = sub.add_parser("rebuild", help="re-embed all of a user's notes into a fresh index")
+    build.add_argument("--user-id", type=int, required=True)
+    build.add_argument("--page-size", type=int, default=1000)
+    build.add_argument("--batch-size", type=int, default=64)
+    args = parser.parse_args(argv)
+    total = rebuild(args.user_id, args.page_size, args.batch_size)
+    print(f"rebuilt index for user {args.user_id}: {total} notes")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
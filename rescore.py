@@ -0,0 +1,151 @@
+import argparse
+import hashlib
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from database import supabase_get, supabase_post
+
+# --- Historical re-scoring job ---
+# Streams notes from Supabase in id order, scores them in large batches across
+# a process pool and writes the new predictions back through the
+# journal_rescore RPC (supabase/journal_model_version.sql). Each
+# row is tagged with the scoring version and progress is checkpointed, so an
+# interrupted run resumes where it stopped.
+#   python rescore.py --all --workers 4
+#   python rescore.py --user-id 12 --batch-size 512
+
+RESCORE_COLUMNS = "id,user_id,body,model_version"
+
+
+def _init_worker():
+    # Warm the models once per worker process instead of once per batch
+    from model_registry import warm_models
+    warm_models(background=False)
+
+
+def score_batch(texts):
+    from project_utils import predict_many
+    return predict_many(texts)
+
+
+def fetch_page(after_id, page_size, version, user_id=None, force=False):
+    params = {
+        "select": RESCORE_COLUMNS,
+        "id": f"gt.{after_id}",
+        "order": "id",
+        "limit": str(page_size),
+    }
+    if user_id is not None:
+        params["user_id"] = f"eq.{user_id}"
+    if not force:
+        params["or"] = f'(model_version.is.null,model_version.neq."{version}")'
+    res = supabase_get("Journals", params=params)
+    res.raise_for_status()
+    return res.json()
+
+
+def body_md5(body):
+    return hashlib.md5((body or "").encode("utf-8")).hexdigest()
+
+
+def write_back(rows):
+    # Prediction columns only; rows edited since they were fetched are skipped
+    # server-side, so the job never reverts a user's changes
+    res = supabase_post("rpc/journal_rescore", json={"p_rows": rows})
+    res.raise_for_status()
+    return res.json()
+
+
+def load_checkpoint(path, version, user_id=None, force=False):
+    # Resumes only a run with the same version and scope; anything else starts over
+    scope = {"model_version": version, "user_id": user_id, "force": force}
+    if path and os.path.exists(path):
+        with open(path) as f:
+            state = json.load(f)
+        if all(state.get(key) == value for key, value in scope.items()):
+            return state
+        print(f"ignoring {path}: it belongs to a different run")
+    return {**scope, "last_id": 0, "scored": 0}
+
+
+def save_checkpoint(path, state):
+    if not path:
+        return
+    tmp = f"{path}.tmp"
+    with open(tmp, "w") as f:
+        json.dump(state, f)
+    os.replace(tmp, path)
+
+
+def rescore(user_id=None, page_size=1000, batch_size=256, workers=2, checkpoint=None, force=False, dry_run=False):
+    from project_utils import scoring_version
+    version = scoring_version()
+    state = load_checkpoint(checkpoint, version, user_id, force)
+    pool = ProcessPoolExecutor(max_workers=workers, initializer=_init_worker) if workers > 0 else None
+    started = time.time()
+    try:
+        while True:
+            page = fetch_page(state["last_id"], page_size, version, user_id, force)
+            if not page:
+                break
+            texts = [row.get("body") or "" for row in page]
+            batches = [texts[i:i + batch_size] for i in range(0, len(texts), batch_size)]
+            scored = pool.map(score_batch, batches) if pool else map(score_batch, batches)
+            predictions = [prediction for batch in scored for prediction in batch]
+            rows = [
+                {
+                    "id": row["id"],
+                    "body_md5": body_md5(row.get("body")),
+                    "pred_depression": dep,
+                    "pred_schizophrenia": schizo,
+                    "prediction_message": str(msg).strip() if msg else "",
+                    "model_version": version,
+                }
+                for row, (dep, schizo, msg) in zip(page, predictions)
+            ]
+            written = len(rows) if dry_run else write_back(rows)
+            state["last_id"] = page[-1]["id"]
+            state["scored"] += len(rows)
+            state["skipped"] = state.get("skipped", 0) + len(rows) - written
+            save_checkpoint(checkpoint, state)
+            rate = state["scored"] / max(time.time() - started, 1e-9)
+            print(f"scored {state['scored']} notes (last id {state['last_id']}, "
+                  f"{state['skipped']} edited mid-run, {rate:.1f} notes/s)")
+            if len(page) < page_size:
+                break
+        # Finished: the next run (e.g. --force, or a different scope) starts from the beginning
+        if checkpoint and os.path.exists(checkpoint):
+            os.remove(checkpoint)
+    finally:
+        if pool:
+            pool.shutdown()
+    return state
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Re-score stored journal predictions with the current models.")
+    scope = parser.add_mutually_exclusive_group(required=True)
+    scope.add_argument("--user-id", type=int, help="only re-score this user's notes")
+    scope.add_argument("--all", action="store_true", help="re-score every user's notes")
+    parser.add_argument("--page-size", type=int, default=1000, help="rows fetched and written back per request")
+    parser.add_argument("--batch-size", type=int, default=256, help="notes per model batch")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="scoring processes (0 = in-process)")
+    parser.add_argument("--checkpoint", default="rescore_checkpoint.json", help="progress file used to resume")
+    parser.add_argument("--force", action="store_true", help="re-score rows already tagged with the current version")
+    parser.add_argument("--dry-run", action="store_true", help="score but don't write back")
+    args = parser.parse_args()
+    state = rescore(
+        user_id=args.user_id,
+        page_size=args.page_size,
+        batch_size=args.batch_size,
+        workers=args.workers,
+        checkpoint=args.checkpoint,
+        force=args.force,
+        dry_run=args.dry_run,
+    )
+    print(f"done: {state['scored']} notes at model version {state['model_version']}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,30 @@
+-- Records which model version produced a row's stored predictions.
+-- Written by rescore.py; rows with a NULL or different version are re-scored.
+alter table public."Journals" add column if not exists model_version text;
+
+-- Bulk write-back for rescore.py. Only touches the prediction columns, and
+-- skips rows whose body changed after the job read them (body_md5 is the
+-- md5 of the body that was scored), so concurrent edits are never reverted.
+create or replace function public.journal_rescore(p_rows jsonb)
+returns integer
+language sql
+as $$
+  with updated as (
+    update public."Journals" j
+    set pred_depression = r.pred_depression,
+        pred_schizophrenia = r.pred_schizophrenia,
+        prediction_message = r.prediction_message,
+        model_version = r.model_version
+    from jsonb_to_recordset(p_rows) as r(
+      id bigint,
+      body_md5 text,
+      pred_depression double precision,
+      pred_schizophrenia double precision,
+      prediction_message text,
+      model_version text
+    )
+    where j.id = r.id and md5(coalesce(j.body, '')) = r.body_md5
+    returning 1
+  )
+  select count(*)::integer from updated;
+$$;
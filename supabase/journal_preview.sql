@@ -0,0 +1,11 @@
+-- Computed column for the Saved Notes grid.
+-- PostgREST exposes functions that take a table row as virtual columns, so
+-- `select=id,title,date_time,preview` returns a truncated body instead of the
+-- full text of every entry.
+create or replace function public.preview(public."Journals")
+returns text
+language sql
+stable
+as $$
+  select left($1.body, 200);
+$$;
@@ -0,0 +1,26 @@
+-- Optional server-side aggregation for the Statistics dashboard.
+-- Enable it by setting SUPABASE_STATS_RPC=journal_stats.
+create or replace function public.journal_stats(p_user_id bigint, p_bucket text)
+returns table (
+  bucket timestamp,
+  pred_depression_mean double precision,
+  pred_depression_min double precision,
+  pred_depression_max double precision,
+  pred_depression_count bigint,
+  pred_schizophrenia_mean double precision,
+  pred_schizophrenia_min double precision,
+  pred_schizophrenia_max double precision,
+  pred_schizophrenia_count bigint
+)
+language sql
+stable
+as $$
+  select
+    date_trunc(p_bucket, date_time::timestamp) as bucket,
+    avg(pred_depression), min(pred_depression), max(pred_depression), count(pred_depression),
+    avg(pred_schizophrenia), min(pred_schizophrenia), max(pred_schizophrenia), count(pred_schizophrenia)
+  from public."Journals"
+  where user_id = p_user_id
+  group by 1
+  order by 1;
+$$;
@@ -0,0 +1,137 @@
+import functools
+import json
+import logging
+import os
+import threading
+import time
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# --- Lightweight tracing ---
+# Spans record wall time plus optional attributes (payload bytes, cache hits,
+# status...). They are collected per rerun on the script thread, aggregated
+# per name for the Prometheus endpoint, and optionally logged as JSON lines.
+TRACE_LOG = os.getenv("TRACE_LOG", "0") == "1"
+TRACE_METRICS_PORT = os.getenv("TRACE_METRICS_PORT")
+
+logger = logging.getLogger("harmony.trace")
+if TRACE_LOG and not logger.handlers:
+    logger.addHandler(logging.StreamHandler())
+    logger.setLevel(logging.INFO)
+_local = threading.local()
+_totals = {}  # span name -> [count, seconds, bytes, cache_hits]
+_totals_lock = threading.Lock()
+_metrics_server = None
+
+
+def start_rerun():
+    _local.spans = []
+
+
+def rerun_spans():
+    return list(getattr(_local, "spans", []))
+
+
+def annotate(**attrs):
+    # Add attributes to the innermost open span on this thread
+    stack = getattr(_local, "stack", None)
+    if stack:
+        stack[-1].update(attrs)
+
+
+def _finish(record):
+    with _totals_lock:
+        totals = _totals.setdefault(record["name"], [0, 0.0, 0, 0])
+        totals[0] += 1
+        totals[1] += record["ms"] / 1000
+        totals[2] += int(record.get("bytes", 0) or 0)
+        totals[3] += int(record.get("cache_hits", 0) or 0)
+    spans = getattr(_local, "spans", None)
+    if spans is not None:
+        spans.append(record)
+    if TRACE_LOG:
+        logger.info(json.dumps(record, default=str))
+
+
+@contextmanager
+def span(name, **attrs):
+    stack = _local.__dict__.setdefault("stack", [])
+    record = {"name": name, "depth": len(stack), "thread": threading.current_thread().name, **attrs}
+    stack.append(record)
+    start = time.perf_counter()
+    try:
+        yield record
+    except Exception as e:
+        record["error"] = type(e).__name__
+        raise
+    finally:
+        record["ms"] = round((time.perf_counter() - start) * 1000, 3)
+        stack.pop()
+        _finish(record)
+
+
+def traced(name=None):
+    def decorate(fn):
+        span_name = name or fn.__name__
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            with span(span_name):
+                return fn(*args, **kwargs)
+        return wrapper
+    return decorate
+
+
+# --- Prometheus export ---
+def _label(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"')
+
+
+def metrics_text():
+    with _totals_lock:
+        totals = {name: list(values) for name, values in _totals.items()}
+    lines = [
+        "# HELP harmony_span_seconds Wall time spent in traced spans.",
+        "# TYPE harmony_span_seconds summary",
+    ]
+    for name, (count, seconds, _, _) in sorted(totals.items()):
+        lines.append(f'harmony_span_seconds_count{{span="{_label(name)}"}} {count}')
+        lines.append(f'harmony_span_seconds_sum{{span="{_label(name)}"}} {seconds:.6f}')
+    lines += ["# HELP harmony_span_bytes_total Payload bytes seen by traced spans.",
+              "# TYPE harmony_span_bytes_total counter"]
+    for name, (_, _, size, _) in sorted(totals.items()):
+        lines.append(f'harmony_span_bytes_total{{span="{_label(name)}"}} {size}')
+    lines += ["# HELP harmony_span_cache_hits_total Cache hits reported by traced spans.",
+              "# TYPE harmony_span_cache_hits_total counter"]
+    for name, (_, _, _, hits) in sorted(totals.items()):
+        lines.append(f'harmony_span_cache_hits_total{{span="{_label(name)}"}} {hits}')
+    return "\n".join(lines) + "\n"
+
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def log_message(self, format, *args):
+        pass
+
+    def do_GET(self):
+        if self.path.rstrip("/") != "/metrics":
+            self.send_error(404)
+            return
+        body = metrics_text().encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+def start_metrics_server(port=None):
+    # Serves /metrics once per process; no-op unless a port is configured
+    global _metrics_server
+    port = port or TRACE_METRICS_PORT
+    if not port or _metrics_server is not None:
+        return _metrics_server
+    with _totals_lock:
+        if _metrics_server is None:
+            _metrics_server = ThreadingHTTPServer(("0.0.0.0", int(port)), _MetricsHandler)
+            threading.Thread(target=_metrics_server.serve_forever, name="trace-metrics", daemon=True).start()
+    return _metrics_server
@@ -0,0 +1,365 @@
+import glob
+import hashlib
+import json
+import logging
+import os
+import queue
+import threading
+import time
+import requests
+from analytics import mark_changed
+from database import supabase_patch, supabase_post
+from project_utils import build_note, predict_many
+from related_entries import index_notes
+
+# --- Write-behind persistence ---
+# Notes are inserted right away with empty prediction fields; a background
+# worker scores them, PATCHes the predictions in and adds the body to the
+# related-entries index. The worker drains everything queued at once, so
+# notes saved together are scored and embedded as one batch. Writes that fail because
+# Supabase is unreachable go to a local outbox (persisted as JSON lines) and
+# are retried until they succeed; so do scoring and embedding that fail (e.g.
+# while the inference service is down), with exponential backoff. Each process keeps its
+# own outbox file (<WRITE_BEHIND_OUTBOX>.<pid>) and adopts the files of
+# processes that are no longer running. Sessions pick up finished work on their
+# next rerun via pop_completed()/pop_inserted().
+WRITE_BEHIND_OUTBOX = os.getenv("WRITE_BEHIND_OUTBOX", ".harmony_outbox.jsonl")
+WRITE_BEHIND_RETRY_SECONDS = float(os.getenv("WRITE_BEHIND_RETRY_SECONDS", "15"))
+WRITE_BEHIND_MAX_BACKOFF = float(os.getenv("WRITE_BEHIND_MAX_BACKOFF", "300"))
+
+logger = logging.getLogger("harmony.write_behind")
+_jobs = queue.Queue()
+_lock = threading.Lock()
+_write_lock = threading.Lock()  # serializes PATCHes so a stale-result check can't race an edit
+_outbox = []
+_completed = {}  # user_id -> {note_id: patched fields}
+_inserted = {}  # user_id -> [rows inserted from the outbox]
+_scoring = {}  # note_id -> md5 of the newest body; older scoring results are dropped
+_model_backoff = 0.0  # shared by scoring and embedding retries
+_model_retry_at = 0.0
+DEFERRED_OPS = ("score", "embed")  # model work, retried separately from writes
+_worker = None
+
+
+class _Retry(Exception):
+    # Transient failure (network error, timeout, 408/429/5xx): keep the op in the outbox
+    pass
+
+
+def _check(res, expected):
+    if res.status_code in expected:
+        return res
+    if res.status_code in (408, 429) or res.status_code >= 500:
+        raise _Retry(f"{res.status_code}: {res.text}")
+    raise ValueError(f"{res.status_code}: {res.text}")
+
+
+def _digest(body):
+    return hashlib.md5((body or "").encode("utf-8")).hexdigest()
+
+
+# --- Outbox ---
+def _outbox_path():
+    return f"{WRITE_BEHIND_OUTBOX}.{os.getpid()}"
+
+
+def _pid_alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+
+def _claim_outboxes():
+    # Returns [(path, ops)] for this process's own file plus those left behind by
+    # exited processes (and the pre-pid shared file); renaming a file claims it,
+    # so only one process ever replays it
+    own = _outbox_path()
+    claimed = []
+    for path in sorted(glob.glob(f"{glob.escape(WRITE_BEHIND_OUTBOX)}.*")) + [WRITE_BEHIND_OUTBOX]:
+        # "<pid>", or "<pid>.claimed-..." left by a process that died mid-claim
+        pid, _, rest = path[len(WRITE_BEHIND_OUTBOX) + 1:].partition(".")
+        if rest.endswith("tmp") or (pid and not pid.isdigit()):
+            continue
+        if pid and int(pid) != os.getpid() and _pid_alive(int(pid)):
+            continue
+        target = f"{own}.claimed-{time.time_ns()}-{len(claimed)}"
+        try:
+            os.rename(path, target)
+        except FileNotFoundError:
+            continue  # gone, or claimed by another process first
+        with open(target, encoding="utf-8") as f:
+            claimed.append((target, [json.loads(line) for line in f if line.strip()]))
+    return claimed
+
+
+def _load_outbox():
+    if not WRITE_BEHIND_OUTBOX:
+        return []
+    claimed = _claim_outboxes()
+    ops = [op for _, file_ops in claimed for op in file_ops]
+    with _lock:
+        _outbox.extend(ops)
+        _persist_outbox()
+    # Only drop the claimed files once their ops are in this process's outbox
+    for path, _ in claimed:
+        os.remove(path)
+    return ops
+
+
+def _persist_outbox():
+    if not WRITE_BEHIND_OUTBOX:
+        return
+    path = _outbox_path()
+    if not _outbox:
+        if os.path.exists(path):
+            os.remove(path)
+        return
+    tmp = f"{path}.tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        for op in _outbox:
+            f.write(json.dumps(op) + "\n")
+    os.replace(tmp, path)
+
+
+def _enqueue(*ops):
+    with _lock:
+        _outbox.extend(ops)
+        _persist_outbox()
+    _ensure_worker()
+
+
+def pending_count(user_id):
+    # Queued writes only; notes waiting to be re-scored already show as pending
+    with _lock:
+        return sum(1 for op in _outbox if op["user_id"] == user_id and op["op"] not in DEFERRED_OPS)
+
+
+# --- Operations ---
+def _insert(note):
+    res = _check(supabase_post("Journals", json=note, headers={"Prefer": "return=representation"}), (201,))
+    mark_changed(note["user_id"])
+    return res.json()[0]
+
+
+def _patch(note_id, user_id, fields, body_md5=None):
+    # body_md5: the body a prediction was computed from; skipped if the note
+    # has been edited to a different body since
+    with _write_lock:
+        if body_md5 is not None:
+            with _lock:
+                if _scoring.get(note_id, body_md5) != body_md5:
+                    return
+        _check(supabase_patch(f"Journals?id=eq.{note_id}", json=fields), (200, 204))
+        mark_changed(user_id)
+        with _lock:
+            _completed.setdefault(user_id, {})[note_id] = fields
+            if body_md5 is not None and _scoring.get(note_id) == body_md5:
+                del _scoring[note_id]
+
+
+def _patch_or_enqueue(note_id, user_id, fields, body_md5=None):
+    op = {"op": "patch", "user_id": user_id, "note_id": note_id, "fields": fields}
+    if body_md5 is not None:
+        op["body_md5"] = body_md5
+    with _lock:
+        behind = any(queued.get("note_id") == note_id and queued["op"] not in DEFERRED_OPS for queued in _outbox)
+    if behind:
+        # An older write to this note is still queued; don't overtake it
+        _enqueue(op)
+        return False
+    try:
+        _patch(note_id, user_id, fields, body_md5)
+    except (_Retry, requests.RequestException):
+        _enqueue(op)
+        return False
+    return True
+
+
+def _score(jobs):
+    # jobs: [(note_id, user_id, body), ...]; one predict_many call for all of them.
+    # Returns False when scoring failed and the jobs were queued for a retry.
+    try:
+        predictions = predict_many([body for _, _, body in jobs])
+    except Exception as e:
+        logger.warning("Scoring %d notes failed, queued for retry: %s", len(jobs), e)
+        _enqueue(*({"op": "score", "user_id": user_id, "note_id": note_id, "body": body}
+                   for note_id, user_id, body in jobs))
+        return False
+    for (note_id, user_id, body), (dep, schizo, msg) in zip(jobs, predictions):
+        _patch_or_enqueue(note_id, user_id, {
+            "pred_depression": dep,
+            "pred_schizophrenia": schizo,
+            "prediction_message": str(msg).strip() if msg else "",
+        }, _digest(body))
+    return True
+
+
+def _embed(jobs):
+    # jobs: [(note_id, user_id, body), ...]; one embedding batch per user.
+    # Returns False when some batch failed and was queued for a retry.
+    by_user = {}
+    for note_id, user_id, body in jobs:
+        by_user.setdefault(user_id, []).append((note_id, body))
+    ok = True
+    for user_id, notes in by_user.items():
+        try:
+            index_notes(user_id, notes)
+        except Exception as e:
+            logger.warning("Embedding %d notes failed, queued for retry: %s", len(notes), e)
+            _enqueue(*({"op": "embed", "user_id": user_id, "note_id": note_id, "body": body}
+                       for note_id, body in notes))
+            ok = False
+    return ok
+
+
+def _replay(op):
+    if op["op"] == "insert":
+        row = _insert(op["note"])
+        with _lock:
+            _inserted.setdefault(op["user_id"], []).append(row)
+        if row.get("pred_depression") is None:
+            schedule_scoring(row["id"], op["user_id"], row["body"])
+        schedule_embedding(row["id"], op["user_id"], row["body"])
+    else:
+        _patch(op["note_id"], op["user_id"], op["fields"], op.get("body_md5"))
+
+
+def _retry_model_work(ops):
+    # Scoring and embedding ops are retried as batches, backing off while they keep failing
+    global _model_backoff, _model_retry_at
+    with _lock:
+        for op in ops:
+            _outbox.remove(op)
+        _persist_outbox()
+    ok = True
+    for name, fn in (("score", _score), ("embed", _embed)):
+        batch = [(op["note_id"], op["user_id"], op["body"]) for op in ops if op["op"] == name]
+        if batch:
+            ok = fn(batch) and ok
+    if ok:
+        _model_backoff = 0.0
+    else:
+        _model_backoff = min(max(2 * _model_backoff, WRITE_BEHIND_RETRY_SECONDS), WRITE_BEHIND_MAX_BACKOFF)
+        _model_retry_at = time.monotonic() + _model_backoff
+
+
+def _flush_outbox():
+    with _lock:
+        ops = [op for op in _outbox if op["op"] not in DEFERRED_OPS]
+        deferred = [op for op in _outbox if op["op"] in DEFERRED_OPS]
+    if deferred and time.monotonic() >= _model_retry_at:
+        _retry_model_work(deferred)
+    for op in ops:
+        try:
+            _replay(op)
+        except (_Retry, requests.RequestException) as e:
+            logger.warning("Supabase still unreachable, keeping %d queued writes: %s", len(ops), e)
+            return  # keep order; try again on the next tick
+        except Exception as e:
+            logger.error("Dropping queued write %s: %s", op, e)
+        with _lock:
+            _outbox.remove(op)
+            _persist_outbox()
+
+
+# --- Worker ---
+def _run():
+    next_flush = 0.0
+    while True:
+        try:
+            job = _jobs.get(timeout=WRITE_BEHIND_RETRY_SECONDS)
+        except queue.Empty:
+            job = None
+        jobs = [job] if job is not None else []
+        while True:
+            try:
+                jobs.append(_jobs.get_nowait())
+            except queue.Empty:
+                break
+        grouped = {}  # fn -> [args, ...], in the order first seen
+        for fn, args in jobs:
+            grouped.setdefault(fn, []).append(args)
+        for fn, batch in grouped.items():
+            try:
+                fn(batch)
+            except Exception as e:
+                logger.error("Background %s of %d notes failed: %s", fn.__name__, len(batch), e)
+        if _outbox and time.monotonic() >= next_flush:
+            _flush_outbox()
+            next_flush = time.monotonic() + WRITE_BEHIND_RETRY_SECONDS
+
+
+def _ensure_worker():
+    global _worker
+    with _lock:
+        if _worker is None or not _worker.is_alive():
+            _worker = threading.Thread(target=_run, name="write-behind", daemon=True)
+            _worker.start()
+
+
+def schedule_scoring(note_id, user_id, body):
+    with _lock:
+        _scoring[note_id] = _digest(body)
+    _jobs.put((_score, (note_id, user_id, body)))
+    _ensure_worker()
+
+
+def schedule_embedding(note_id, user_id, body):
+    # Embeddings are computed once here, never when related entries are read
+    _jobs.put((_embed, (note_id, user_id, body)))
+    _ensure_worker()
+
+
+# --- Session API ---
+def save_note(title, body, user_id, prediction=None):
+    # Returns ("saved", row), ("queued", None) or ("failed", error message)
+    pred_depression, pred_schizophrenia, message = prediction or (None, None, "")
+    note = build_note(title, body, pred_depression, pred_schizophrenia, message, user_id)
+    try:
+        row = _insert(note)
+    except (_Retry, requests.RequestException):
+        _enqueue({"op": "insert", "user_id": user_id, "note": note})
+        return "queued", None
+    except ValueError as e:
+        return "failed", str(e)
+    if prediction is None:
+        schedule_scoring(row["id"], user_id, body)
+    schedule_embedding(row["id"], user_id, body)
+    return "saved", row
+
+
+def update_note(note_id, user_id, fields):
+    # Returns ("saved", None), ("queued", None) or ("failed", error message)
+    if not fields:
+        return "saved", None
+    if "prediction_message" in fields:
+        msg = fields["prediction_message"]
+        fields = {**fields, "prediction_message": str(msg).strip() if msg else ""}
+    if "body" in fields:
+        with _lock:
+            if note_id in _scoring:
+                # A scoring run for the old body is still in flight; its result is now stale
+                _scoring[note_id] = _digest(fields["body"])
+    try:
+        saved = _patch_or_enqueue(note_id, user_id, fields)
+    except ValueError as e:
+        return "failed", str(e)
+    return ("saved" if saved else "queued"), None
+
+
+def pop_completed(user_id):
+    with _lock:
+        return _completed.pop(user_id, {})
+
+
+def pop_inserted(user_id):
+    with _lock:
+        return _inserted.pop(user_id, [])
+
+
+if _load_outbox():
+    _ensure_worker()